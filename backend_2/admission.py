@@ -0,0 +1,101 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Tuple
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from utils import token_user_id
+
+admission_max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "256"))
+admission_retry_after = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+admission_max_keys = int(os.getenv("ADMISSION_MAX_KEYS", "100000"))
+
+auth_paths = {"/base/token", "/base/registration"}
+read_methods = {"GET", "HEAD", "OPTIONS"}
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: float, maxsize: int):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.maxsize = maxsize
+        self.buckets = OrderedDict()
+
+    def acquire(self, key) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.maxsize:
+            self.buckets.popitem(last=False)
+        return wait
+
+def limiter(name: str, rate: str, burst: str) -> RateLimiter:
+    return RateLimiter(
+        float(os.getenv(f"ADMISSION_{name.upper()}_RATE", rate)),
+        float(os.getenv(f"ADMISSION_{name.upper()}_BURST", burst)),
+        admission_max_keys
+    )
+
+limiters = {
+    "auth": limiter("auth", "2", "10"),
+    "writes": limiter("writes", "20", "40"),
+    "reads": limiter("reads", "50", "100"),
+}
+admission_stats = {"in_flight": 0, "rate_limited": 0, "shed": 0}
+
+
+def route_class(method: str, path: str) -> str:
+    if path in auth_paths:
+        return "auth"
+    return "reads" if method in read_methods else "writes"
+
+def client_key(scope, route: str) -> Tuple[str, object]:
+    if route != "auth":
+        token = dict(scope["headers"]).get(b"token")
+        if token:
+            try:
+                return "user", token_user_id(token.decode("latin-1"))
+            except HTTPException:
+                pass
+    client = scope.get("client")
+    return "ip", client[0] if client else None
+
+def is_stream(path: str) -> bool:
+    return path.endswith("/events")
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route = route_class(scope["method"], scope["path"])
+        wait = limiters[route].acquire(client_key(scope, route))
+        if wait:
+            admission_stats["rate_limited"] += 1
+            return await self.reject(scope, receive, send, 429, "Too many requests, retry later.", math.ceil(wait))
+        if is_stream(scope["path"]):
+            return await self.app(scope, receive, send)
+        if admission_stats["in_flight"] >= admission_max_in_flight:
+            admission_stats["shed"] += 1
+            return await self.reject(scope, receive, send, 503, "Server is overloaded, retry later.", admission_retry_after)
+        admission_stats["in_flight"] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_stats["in_flight"] -= 1
+
+    async def reject(self, scope, receive, send, status: int, detail: str, retry_after: int):
+        response = JSONResponse({"detail": detail}, status_code=status, headers={"Retry-After": str(retry_after)})
+        await response(scope, receive, send)
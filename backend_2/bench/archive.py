@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import time
+from datetime import timedelta
+from sqlalchemy import func
+from sqlmodel import SQLModel, Session, select
+from database.db import make_engine
+from database.models import Order, OrderArchive, OrderStatus, utcnow
+import serializers
+
+STATUSES = [OrderStatus.confirmed] * 70 + [OrderStatus.cancelled] * 25 + [OrderStatus.created, OrderStatus.acknowledged, OrderStatus.shipped, OrderStatus.received] + [OrderStatus.created]
+
+
+def seed(engine, orders: int, buyers: int, sellers: int, batch_size: int = 100000):
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(0)
+    now = utcnow()
+    old, recent = str(now - timedelta(days=90)), str(now)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO user (id, email, name, password_hash, role) VALUES (?, ?, ?, 'x', ?)",
+            [(i, f"user{i}@example.com", f"user{i}", "seller" if i <= sellers else "buyer") for i in range(1, sellers + buyers + 1)]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO product (id, seller_id, name, description, price, stock, reserved) VALUES (?, ?, ?, 'bench', 1.0, 1000000, 0)",
+            [(i, i, f"product {i}") for i in range(1, sellers + 1)]
+        )
+    for start in range(0, orders, batch_size):
+        rows = []
+        for _ in range(start, min(start + batch_size, orders)):
+            status = rng.choice(STATUSES)
+            seller_id = rng.randint(1, sellers)
+            terminal = status in (OrderStatus.confirmed, OrderStatus.cancelled)
+            created_at = old if terminal else recent
+            rows.append((rng.randint(sellers + 1, sellers + buyers), seller_id, seller_id, 1, 1.0, status.name, created_at, created_at))
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                'INSERT INTO "order" (buyer_id, seller_id, product_id, quantity, total_price, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+def measure(engine, buyers: int, sellers: int, iterations: int) -> dict:
+    rng = random.Random(1)
+
+    def percentile(values, q):
+        values = sorted(values)
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 3)
+
+    report = {}
+    with Session(engine) as db:
+        live_ids = db.exec(select(Order.id).order_by(func.random()).limit(iterations)).all()
+        cases = {
+            "buyer_orders": lambda: serializers.buyer_orders(db, rng.randint(sellers + 1, sellers + buyers)),
+            "seller_orders": lambda: serializers.seller_orders(db, rng.randint(1, sellers)),
+            "get_order": lambda: db.get(Order, rng.choice(live_ids)),
+        }
+        for name, case in cases.items():
+            latencies = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                case()
+                latencies.append(time.perf_counter() - started)
+                db.expunge_all()
+            report[name] = {"p50_ms": percentile(latencies, 0.5), "p95_ms": percentile(latencies, 0.95)}
+        report["live_orders"] = db.exec(select(func.count(Order.id))).one()
+        report["archived_orders"] = db.exec(select(func.count(OrderArchive.id))).one()
+    return report
+
+def archive(engine, batch_size: int) -> dict:
+    cutoff = utcnow() - timedelta(days=30)
+    archived = 0
+    started = time.perf_counter()
+    with Session(engine) as db:
+        while True:
+            order_ids = OrderArchive.archivable_ids(db, cutoff, batch_size)
+            if not order_ids:
+                break
+            archived += OrderArchive.archive(db, order_ids)
+    elapsed = time.perf_counter() - started
+    return {"archived": archived, "seconds": round(elapsed, 2), "rows_per_second": round(archived / elapsed) if elapsed else None}
+
+def main():
+    parser = argparse.ArgumentParser(description="Order listing latency before and after archiving terminal orders.")
+    parser.add_argument("--orders", type=int, default=10000000)
+    parser.add_argument("--buyers", type=int, default=100000)
+    parser.add_argument("--sellers", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{tempfile.mkdtemp()}/archive.db"
+    engine = make_engine(url)
+    started = time.perf_counter()
+    seed(engine, args.orders, args.buyers, args.sellers)
+    report = {"orders": args.orders, "seed_seconds": round(time.perf_counter() - started, 2)}
+    report["before"] = measure(engine, args.buyers, args.sellers, args.iterations)
+    report["archive"] = archive(engine, args.batch_size)
+    report["after"] = measure(engine, args.buyers, args.sellers, args.iterations)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
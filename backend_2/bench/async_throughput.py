@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+
+
+def seed(products: int, orders: int):
+    from sqlmodel import Session
+    from database.db import create_db_and_tables, get_engine
+    from database.models import User, Product, Wallet, Order, Role
+    from utils import hash_password, generate_token
+    create_db_and_tables()
+    with Session(get_engine()) as db:
+        password_hash = hash_password("password")
+        seller = User(email="seller@example.com", name="seller", password_hash=password_hash, role=Role.seller)
+        buyer = User(email="buyer@example.com", name="buyer", password_hash=password_hash, role=Role.buyer)
+        db.add_all([seller, buyer])
+        db.flush()
+        db.add_all([Wallet(user_id=seller.id), Wallet(user_id=buyer.id, balance=1e9)])
+        db.add_all(Product(seller_id=seller.id, name=f"product {i}", description="bench", price=1.0 + i % 100, stock=1000) for i in range(products))
+        db.flush()
+        db.add_all(Order(buyer_id=buyer.id, seller_id=seller.id, product_id=1 + i % products, quantity=1, total_price=1.0) for i in range(orders))
+        db.commit()
+        return generate_token(buyer.id)
+
+async def drive(app, token: str, requests: int, concurrency: int) -> dict:
+    import httpx
+    paths = ["/base/products?limit=20", "/buyer/my_orders", "/base/product/1"]
+    latencies = {path: [] for path in paths}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(paths[i % len(paths)])
+
+    errors = 0
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            path = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers={"token": token})
+                response.raise_for_status()
+            except Exception:
+                errors += 1
+                continue
+            latencies[path].append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    def percentile(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    return {
+        "rps": round((requests - errors) / elapsed, 1),
+        "errors": errors,
+        "endpoints": {
+            path: {"p50_ms": round(percentile(values, 0.5), 2), "p99_ms": round(percentile(values, 0.99), 2)}
+            for path, values in latencies.items() if values
+        },
+    }
+
+async def run_app(token: str, requests: int, concurrency: int) -> dict:
+    from main import app
+    from database.db import dispose_engines
+    try:
+        return await drive(app, token, requests, concurrency)
+    finally:
+        await dispose_engines()
+
+def run_worker(args):
+    print(json.dumps(asyncio.run(run_app(args.token, args.requests, args.concurrency))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async route throughput under concurrency.")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--token", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return run_worker(args)
+
+    os.environ.setdefault("DB_PATH", f"sqlite:///{tempfile.mkdtemp()}/async_throughput.db")
+    os.environ.setdefault("ADMISSION_ENABLED", "0")
+    token = seed(args.products, args.orders)
+    report = {}
+    for mode in ("0", "1"):
+        name = "async" if mode == "1" else "sync"
+        try:
+            output = subprocess.run(
+                [sys.executable, "-m", "bench.async_throughput", "--worker", "--token", token,
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+                env={**os.environ, "ASYNC_DB": mode},
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                capture_output=True, text=True, check=True, timeout=args.timeout,
+            ).stdout
+        except subprocess.TimeoutExpired:
+            report[name] = {"error": f"did not finish within {args.timeout}s"}
+            continue
+        report[name] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
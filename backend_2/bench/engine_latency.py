@@ -0,0 +1,118 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, Session, select, update
+from database.db import make_engine
+from database.models import User, Product, Wallet, Order, Role
+from schems.posts import CatalogQuery
+import serializers
+
+
+def seed(engine, products: int, buyers: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        seller = User(email="seller@example.com", name="seller", password_hash="x", role=Role.seller)
+        db.add(seller)
+        db.flush()
+        db.add_all(User(email=f"buyer{i}@example.com", name=f"buyer{i}", password_hash="x", role=Role.buyer) for i in range(buyers))
+        db.flush()
+        db.add_all(Wallet(user_id=user_id, balance=1e9) for user_id in db.exec(select(User.id)).all())
+        db.add_all(Product(seller_id=seller.id, name=f"product {i}", description="bench", price=1.0 + i % 100, stock=10**6) for i in range(products))
+        db.commit()
+
+def read(db: Session, rng: random.Random, products: int, buyers: int):
+    Product.get_page(db, CatalogQuery(limit=20, min_price=rng.randint(1, 50)))
+    serializers.buyer_orders(db, rng.randint(2, buyers + 1))
+
+def write(db: Session, rng: random.Random, products: int, buyers: int):
+    buyer_id = rng.randint(2, buyers + 1)
+    product_id = rng.randint(1, products)
+    db.exec(update(Product).where(Product.id == product_id).values(stock=Product.stock - 1, reserved=Product.reserved + 1))
+    db.exec(update(Wallet).where(Wallet.user_id == buyer_id).values(balance=Wallet.balance - 1, frozen=Wallet.frozen + 1))
+    db.add(Order(buyer_id=buyer_id, seller_id=1, product_id=product_id, quantity=1, total_price=1.0))
+    db.commit()
+
+def run(write_engine, read_engine, args) -> dict:
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed_value: int):
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            kind = "write" if rng.random() < args.write_ratio else "read"
+            started = time.perf_counter()
+            try:
+                with Session(write_engine if kind == "write" else read_engine) as db:
+                    (write if kind == "write" else read)(db, rng, args.products, args.buyers)
+            except OperationalError:
+                with lock:
+                    errors[kind] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[kind].append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    def percentile(values, q):
+        values = sorted(values)
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2) if values else None
+
+    return {
+        kind: {
+            "ops": len(values),
+            "errors": errors[kind],
+            "p50_ms": percentile(values, 0.5),
+            "p99_ms": percentile(values, 0.99),
+        }
+        for kind, values in latencies.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the default and the tuned SQLite engine under mixed load.")
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    baseline_url = f"sqlite:///{directory}/baseline.db"
+    tuned_url = f"sqlite:///{directory}/tuned.db"
+
+    baseline = create_engine(baseline_url, echo=True)
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger("sqlalchemy.engine.Engine").handlers:
+        handler.setStream(devnull)
+    tuned = make_engine(tuned_url)
+    tuned_read = make_engine(tuned_url, read_only=True)
+
+    seed(baseline, args.products, args.buyers)
+    seed(tuned, args.products, args.buyers)
+    report = {
+        "baseline": run(baseline, baseline, args),
+        "tuned": run(tuned, tuned_read, args),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
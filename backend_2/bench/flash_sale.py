@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("DB_PATH", f"sqlite:///{tempfile.mkdtemp()}/flash_sale_app.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from sqlalchemy import func, insert
+from sqlmodel import SQLModel, Session, select
+from database.db import make_engine
+from database.models import CartItem, Order, Product, ProductStockShard, Role, User, Wallet
+from schems.posts import CreateOrder
+
+
+def seed_users(engine, buyers: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.exec(insert(User), params=[
+            {"id": i, "email": f"user{i}@example.com", "name": f"user{i}", "password_hash": "x", "role": Role.seller if i == 1 else Role.buyer}
+            for i in range(1, buyers + 2)
+        ])
+        db.exec(insert(Wallet), params=[{"user_id": i, "balance": 1000000.0, "frozen": 0.0} for i in range(1, buyers + 2)])
+        db.commit()
+
+def seed_sale(engine, buyers: int, orders: int, stock: int, shards: int) -> tuple:
+    with Session(engine) as db:
+        product = Product(seller_id=1, name="hot", description=None, price=1.0, stock=stock)
+        db.add(product)
+        db.commit()
+        db.exec(insert(CartItem), params=[
+            {"buyer_id": 2 + i % buyers, "product_id": product.id, "quantity": 1} for i in range(orders)
+        ])
+        db.commit()
+        if shards:
+            product.start_flash_sale(db, shards)
+        cart_items = db.exec(select(CartItem.id, CartItem.buyer_id).where(CartItem.product_id == product.id)).all()
+        return product.id, [tuple(row) for row in cart_items]
+
+def run(engine, jobs: list, threads: int) -> dict:
+    def checkout(job) -> str:
+        cart_item_id, buyer_id = job
+        with Session(engine) as db:
+            try:
+                db.get(User, buyer_id).create_order(db, CreateOrder(cart_item_id=cart_item_id))
+                return "ok"
+            except HTTPException as e:
+                return e.detail
+            except Exception as e:
+                return type(e).__name__
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        outcomes = list(pool.map(checkout, jobs))
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(outcomes.count("ok") / elapsed, 1),
+        "outcomes": {outcome: outcomes.count(outcome) for outcome in set(outcomes)},
+    }
+
+def check(engine, product_id: int, stock: int) -> dict:
+    with Session(engine) as db:
+        product = db.get(Product, product_id)
+        if product.flash_sale:
+            product.end_flash_sale(db)
+        ordered = db.exec(select(func.coalesce(func.sum(Order.quantity), 0)).where(Order.product_id == product_id)).one()
+        shards = db.exec(select(func.count()).select_from(ProductStockShard).where(ProductStockShard.product_id == product_id)).one()
+        report = {"stock_left": product.stock, "reserved": product.reserved, "ordered": ordered}
+    assert product.stock >= 0, "stock went negative"
+    assert product.stock + product.reserved == stock, "stock and reservations drifted"
+    assert product.reserved == ordered, "reservations do not match orders"
+    assert ordered <= stock, "oversold"
+    assert shards == 0, "shards left behind"
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Orders per second on a single hot product, with and without flash-sale mode.")
+    parser.add_argument("--url", help="Database URL, defaults to a temporary SQLite file.")
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--stock", type=int, default=4000, help="Less than --orders so the sale sells out.")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--shards", type=int, default=16)
+    args = parser.parse_args()
+
+    engine = make_engine(args.url or f"sqlite:///{tempfile.mkdtemp()}/flash_sale.db")
+    seed_users(engine, args.buyers)
+    report = {"orders": args.orders, "stock": args.stock, "threads": args.threads}
+    for mode, shards in [("normal", 0), ("flash_sale", args.shards)]:
+        product_id, jobs = seed_sale(engine, args.buyers, args.orders, args.stock, shards)
+        report[mode] = run(engine, jobs, args.threads)
+        report[mode].update(check(engine, product_id, args.stock))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="seed")
+
+
+def seed(sellers: int, products: int) -> tuple:
+    from sqlmodel import Session, select
+    from database.db import create_db_and_tables, get_engine
+    from database.models import User, Product, Role
+    from schems.posts import CreateUserOpen, CreateProduct
+    from utils import generate_token
+    create_db_and_tables()
+    seller_tokens = {}
+    catalog = []
+    with Session(get_engine()) as db:
+        for i in range(sellers):
+            User.create_user(db, CreateUserOpen(
+                email=f"seller{i}@bench.example.com", name=f"bench seller {i}", password="password", role=Role.seller
+            ))
+            seller = User.get_by_email(db, f"seller{i}@bench.example.com")
+            seller_tokens[seller.id] = generate_token(seller.id)
+        seller_ids = list(seller_tokens)
+        for i in range(products):
+            seller = User.get_by_id(db, seller_ids[i % len(seller_ids)])
+            seller.add_product(db, CreateProduct(name=f"bench product {i}", description="bench", price=1.0 + i % 50, stock=10**6))
+        catalog = [tuple(row) for row in db.exec(select(Product.id, Product.seller_id)).all()]
+    return seller_tokens, catalog
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.queries = defaultdict(int)
+
+    def count_query(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries[current_endpoint.get()] += 1
+
+    async def call(self, client, label: str, method: str, path: str, **kwargs):
+        token = current_endpoint.set(label)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        finally:
+            current_endpoint.reset(token)
+        self.latencies[label].append(time.perf_counter() - started)
+        self.statuses[label][response.status_code] += 1
+        if response.status_code >= 400:
+            raise RuntimeError(f"{label} -> {response.status_code}: {response.text}")
+        return response
+
+async def buyer_flow(client, recorder: Recorder, index: int, seller_tokens: dict, catalog: list, orders: int, rng: random.Random):
+    email = f"buyer{index}@bench.example.com"
+    await recorder.call(client, "POST /base/registration", "POST", "/base/registration", json={
+        "email": email, "name": f"bench buyer {index}", "password": "password", "role": "buyer"
+    })
+    response = await recorder.call(client, "POST /base/token", "POST", "/base/token", json={"email": email, "password": "password"})
+    headers = {"token": response.json()["access_token"]}
+    await recorder.call(client, "POST /buyer/add_balance/{amount}", "POST", "/buyer/add_balance/100000", headers=headers)
+    for _ in range(orders):
+        product_id, seller_id = rng.choice(catalog)
+        seller_headers = {"token": seller_tokens[seller_id]}
+        await recorder.call(client, "POST /buyer/add_cart_items", "POST", "/buyer/add_cart_items", headers=headers,
+                            json={"product_id": product_id, "quantity": 1})
+        response = await recorder.call(client, "GET /buyer/my_cart_items", "GET", "/buyer/my_cart_items", headers=headers)
+        cart_item_id = response.json()[-1]["id"]
+        await recorder.call(client, "POST /buyer/create_order", "POST", "/buyer/create_order", headers=headers,
+                            json={"cart_item_id": cart_item_id})
+        response = await recorder.call(client, "GET /buyer/my_orders", "GET", "/buyer/my_orders", headers=headers)
+        order_id = max(order["id"] for order in response.json() if order["status"] == "created")
+        for action in ("acknowledged", "shipped"):
+            await recorder.call(client, f"POST /seller/my_orders/{{id}}/{action}", "POST",
+                                f"/seller/my_orders/{order_id}/{action}", headers=seller_headers)
+        for action in ("received", "confirm"):
+            await recorder.call(client, f"POST /buyer/my_orders/{{id}}/{action}", "POST",
+                                f"/buyer/my_orders/{order_id}/{action}", headers=headers)
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def drive(args, seller_tokens: dict, catalog: list) -> dict:
+    import httpx
+    recorder = Recorder()
+    lifespan = nullcontext()
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from sqlalchemy import event
+        from main import app
+        from database.db import get_async_engine, get_async_read_engine, get_engine, get_read_engine
+        binds = {get_engine(), get_read_engine()}
+        if app.state.settings.async_db:
+            binds |= {get_async_engine().sync_engine, get_async_read_engine().sync_engine}
+        for bind in binds:
+            event.listen(bind, "before_cursor_execute", recorder.count_query)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        lifespan = app.router.lifespan_context(app)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    failures = []
+
+    async def run_buyer(index: int):
+        async with semaphore:
+            try:
+                await buyer_flow(client, recorder, index, seller_tokens, catalog, args.orders_per_buyer, random.Random(index))
+            except RuntimeError as e:
+                failures.append(str(e))
+
+    async with lifespan, client:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_buyer(i) for i in range(args.buyers)))
+        elapsed = time.perf_counter() - started
+
+    requests = sum(len(values) for values in recorder.latencies.values())
+    return {
+        "commit": git_commit(),
+        "target": args.url or "in-process",
+        "config": {
+            "sellers": args.sellers, "buyers": args.buyers, "products": args.products,
+            "orders_per_buyer": args.orders_per_buyer, "concurrency": args.concurrency,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "requests": requests,
+        "rps": round(requests / elapsed, 1),
+        "failures": len(failures),
+        "first_failures": failures[:5],
+        "endpoints": {
+            label: {
+                "count": len(values),
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": percentile(values, 0.5),
+                "p95_ms": percentile(values, 0.95),
+                "p99_ms": percentile(values, 0.99),
+                "statuses": dict(recorder.statuses[label]),
+                "db_queries": recorder.queries.get(label) if not args.url else None,
+                "db_queries_per_request": round(recorder.queries.get(label, 0) / len(values), 2) if not args.url else None,
+            }
+            for label, values in sorted(recorder.latencies.items())
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the full buyer/seller order lifecycle and report per-endpoint latency.")
+    parser.add_argument("--sellers", type=int, default=5)
+    parser.add_argument("--buyers", type=int, default=50)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders-per-buyer", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="Benchmark a running server (e.g. http://127.0.0.1:8000) instead of the in-process app. "
+                                      "Seeding still goes through DB_PATH, so point both at the same database.")
+    parser.add_argument("--output", help="Write the JSON report to this file as well as stdout.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_PATH", f"sqlite:///{tempfile.mkdtemp()}/lifecycle.db")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("ADMISSION_ENABLED", "0")
+    seller_tokens, catalog = seed(args.sellers, args.products)
+    report = asyncio.run(drive(args, seller_tokens, catalog))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
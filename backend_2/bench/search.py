@@ -0,0 +1,119 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import itertools
+import json
+import random
+import time
+from sqlalchemy import insert, or_
+from sqlmodel import SQLModel, Session, select
+from cache import caches
+from database.db import make_engine
+from database.models import User, Product, Role
+from schems.posts import SearchQuery
+
+WORDS = [
+    "wireless", "headphones", "lamp", "camping", "table", "chair", "leather", "wallet", "steel", "bottle",
+    "cotton", "shirt", "running", "shoes", "garden", "hose", "kitchen", "knife", "coffee", "grinder",
+    "desk", "organizer", "phone", "charger", "travel", "backpack", "yoga", "mat", "glass", "teapot",
+]
+QUERIES = {
+    "common": ["wireless", "table", "coffee"],
+    "multi_term": ["wireless headphones", "leather wallet", "coffee grinder"],
+    "prefix": ["head", "walle", "ca"],
+    "rare": ["sku12345", "sku777", "sku424242"],
+}
+
+
+def vocabulary(size: int = 20000):
+    words = [f"w{i:x}z" for i in range(size)]
+    for i, word in enumerate(WORDS):
+        words[100 + i * 10] = word
+    return words, list(itertools.accumulate(1 / (rank + 1) for rank in range(size)))
+
+def seed(engine, products: int, batch_size: int = 50000):
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(0)
+    words, weights = vocabulary()
+    with Session(engine) as db:
+        seller = User(email="seller@example.com", name="seller", password_hash="x", role=Role.seller)
+        db.add(seller)
+        db.commit()
+        for start in range(0, products, batch_size):
+            db.exec(insert(Product), params=[
+                {
+                    "seller_id": seller.id,
+                    "name": " ".join(rng.choices(words, cum_weights=weights, k=3) + rng.sample(WORDS, 1)) + f" sku{i}",
+                    "description": " ".join(rng.choices(words, cum_weights=weights, k=24)),
+                    "price": 1.0 + i % 100,
+                    "stock": i % 7,
+                    "reserved": 0,
+                }
+                for i in range(start, min(start + batch_size, products))
+            ])
+            db.commit()
+
+def like(db: Session, query: SearchQuery):
+    pattern = f"%{query.q}%"
+    statement = select(Product).where(or_(Product.name.like(pattern), Product.description.like(pattern)))
+    return db.exec(statement.order_by(Product.id).limit(query.limit)).all()
+
+def cold(db: Session, query: SearchQuery):
+    caches["search"].clear()
+    return Product.search(db, query)
+
+def measure(engine, search, iterations: int) -> dict:
+    def percentile(values, q):
+        values = sorted(values)
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+    report = {}
+    with Session(engine) as db:
+        for kind, queries in QUERIES.items():
+            latencies = []
+            for i in range(iterations):
+                query = SearchQuery(q=queries[i % len(queries)], prefix=kind == "prefix")
+                started = time.perf_counter()
+                search(db, query)
+                latencies.append(time.perf_counter() - started)
+            report[kind] = {
+                "queries": len(latencies),
+                "p50_ms": percentile(latencies, 0.5),
+                "p95_ms": percentile(latencies, 0.95),
+                "p99_ms": percentile(latencies, 0.99),
+            }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /products/search latency, with and without a cached ranking, against a LIKE scan on a Zipf-distributed catalog.")
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--target-ms", type=float, default=20)
+    parser.add_argument("--skip-like", action="store_true")
+    args = parser.parse_args()
+
+    url = f"sqlite:///{tempfile.mkdtemp()}/search.db"
+    engine = make_engine(url)
+    started = time.perf_counter()
+    seed(engine, args.products)
+    seed_seconds = round(time.perf_counter() - started, 2)
+    read_engine = make_engine(url, read_only=True)
+
+    report = {
+        "products": args.products,
+        "seed_seconds": seed_seconds,
+        "fts": measure(read_engine, Product.search, args.iterations),
+        "fts_cold": measure(read_engine, cold, max(1, args.iterations // 10)),
+    }
+    if not args.skip_like:
+        report["like"] = measure(read_engine, like, max(1, args.iterations // 20))
+    report["within_target"] = all(stats["p95_ms"] <= args.target_ms for stats in report["fts"].values())
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
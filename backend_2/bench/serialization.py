@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import SQLModel, Session, select
+from database.db import make_engine
+from database.models import User, Product, Order, OrderStatus, Role
+from schems.posts import OrderFullInfo, ProductFullInfo
+import serializers
+
+
+def seed(engine, rows: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        seller = User(email="seller@example.com", name="seller", password_hash="x", role=Role.seller)
+        buyer = User(email="buyer@example.com", name="buyer", password_hash="x", role=Role.buyer)
+        db.add_all([seller, buyer])
+        db.commit()
+        products = max(1, rows // 10)
+        db.exec(insert(Product), params=[
+            {"seller_id": seller.id, "name": f"product {i}", "description": "bench " * 20, "price": 1.0 + i, "stock": 100, "reserved": 10}
+            for i in range(products)
+        ])
+        db.exec(insert(Order), params=[
+            {"buyer_id": buyer.id, "seller_id": seller.id, "product_id": 1 + i % products, "quantity": 1, "total_price": 2.0, "status": OrderStatus.created}
+            for i in range(rows)
+        ])
+        db.commit()
+        return buyer.id, seller.id
+
+def load_buyer_orders(db: Session, buyer_id: int) -> list:
+    return db.exec(select(Order).where(Order.buyer_id == buyer_id).options(joinedload(Order.product)).order_by(Order.id)).all()
+
+def load_seller_products(db: Session, seller_id: int) -> list:
+    statement = (
+        select(Product)
+        .where(Product.seller_id == seller_id)
+        .options(selectinload(Product.orders).joinedload(Order.product))
+        .order_by(Product.id)
+    )
+    return db.exec(statement).all()
+
+def validated(model, load):
+    adapter = TypeAdapter(list[model])
+
+    def render(db: Session, owner_id: int) -> bytes:
+        content = [model.model_validate(item, from_attributes=True) for item in load(db, owner_id)]
+        value = adapter.validate_python(content, from_attributes=True)
+        return json.dumps(jsonable_encoder(adapter.dump_python(value, mode="json"))).encode()
+    return render
+
+def direct(load):
+    def render(db: Session, owner_id: int) -> bytes:
+        return orjson.dumps(load(db, owner_id))
+    return render
+
+def measure(engine, render, owner_id: int, rows: int, iterations: int) -> float:
+    with Session(engine) as db:
+        render(db, owner_id)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            render(db, owner_id)
+            db.expunge_all()
+        elapsed = time.perf_counter() - started
+    return round(elapsed / iterations / rows * 1000 * 1000, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare validated and row-based response rendering, in ms per 1k rows.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    cases = {
+        "buyer_orders": (
+            validated(OrderFullInfo, load_buyer_orders), direct(serializers.buyer_orders), "buyer"
+        ),
+        "seller_products": (
+            validated(ProductFullInfo, load_seller_products), direct(serializers.seller_products), "seller"
+        ),
+    }
+    report = {}
+    for rows in args.rows:
+        engine = make_engine(f"sqlite:///{tempfile.mkdtemp()}/serialization.db")
+        owners = dict(zip(("buyer", "seller"), seed(engine, rows)))
+        for name, (before, after, owner) in cases.items():
+            report[f"{name}_{rows}"] = {
+                "validated_ms_per_1k": measure(engine, before, owners[owner], rows, args.iterations),
+                "rows_orjson_ms_per_1k": measure(engine, after, owners[owner], rows, args.iterations),
+            }
+        engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
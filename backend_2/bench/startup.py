@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    status = client.get("/base/products").status_code
+    served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "first_request_ms": (served - ready) * 1000,
+    "status": status,
+    "lazy_modules": sorted(name for name in ("bcrypt", "jwt") if name not in sys.modules),
+}))
+"""
+
+
+def start_worker(env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    report["process_ms"] = (time.perf_counter() - started) * 1000
+    return report
+
+def summarize(runs: list) -> dict:
+    summary = {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ("process_ms", "import_ms", "lifespan_ms", "first_request_ms")
+    }
+    summary["statuses"] = sorted({run["status"] for run in runs})
+    summary["lazy_modules"] = runs[0]["lazy_modules"]
+    return summary
+
+def measure(env: dict, runs: int, workers: int) -> dict:
+    sequential = [start_worker(env) for _ in range(runs)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        concurrent = list(pool.map(start_worker, [env] * workers))
+    return {
+        "cold_start": summarize(sequential),
+        "concurrent": {**summarize(concurrent), "workers": workers, "all_ready_ms": round((time.perf_counter() - started) * 1000, 1)},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of one app worker, with create_all at startup and with a migrated database.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    base = {**os.environ, "SCHEDULER_ENABLED": "0", "ADMISSION_ENABLED": "0"}
+    report = {}
+
+    env = {**base, "DB_PATH": f"sqlite:///{directory}/create_all.db", "DB_CREATE_TABLES": "1"}
+    report["create_all"] = measure(env, args.runs, args.workers)
+
+    env = {**base, "DB_PATH": f"sqlite:///{directory}/migrated.db", "DB_CREATE_TABLES": "0"}
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "manage.py", "migrate"], env=env, capture_output=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    report["migrate_once_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    report["migrated"] = measure(env, args.runs, args.workers)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
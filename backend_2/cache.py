@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+caches: Dict[str, "TTLCache"] = {}
+logger = logging.getLogger("cache")
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int, ttl: float, maxbytes: Optional[int] = None, weigh: Callable[[Any], int] = len):
+        self.name = name
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.weigh = weigh
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        caches[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            item = self.data.get(key)
+            if item is None or item[1] <= time.monotonic():
+                if item is not None:
+                    self._pop(key)
+                self.misses += 1
+                return default
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        weight = self.weigh(value) if self.maxbytes is not None else 0
+        with self.lock:
+            self._pop(key)
+            if self.maxbytes is not None and weight > self.maxbytes:
+                return
+            self.data[key] = (value, time.monotonic() + ttl, weight)
+            self.bytes += weight
+            while len(self.data) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+                self.bytes -= self.data.popitem(last=False)[1][2]
+
+    def _pop(self, key: Hashable):
+        item = self.data.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+
+    def delete(self, key: Hashable):
+        with self.lock:
+            self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.data), "maxsize": self.maxsize, "bytes": self.bytes}
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+class MemoryBackend:
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.entries = TTLCache(name, maxsize, ttl)
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.entries.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.entries.set(key, value, ttl)
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self.entries.delete(key)
+
+    def version(self, key: str) -> int:
+        return self.versions.get(key, 0)
+
+    def bump(self, key: str) -> int:
+        with self.lock:
+            self.versions[key] = self.versions.get(key, 0) + 1
+            return self.versions[key]
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(key, value, px=int(ttl * 1000))
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*keys)
+
+    def version(self, key: str) -> int:
+        return int(self.client.get(key) or 0)
+
+    def bump(self, key: str) -> int:
+        return self.client.incr(key)
+
+def make_backend(url: str, name: str, maxsize: int, ttl: float):
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisBackend(url)
+    return MemoryBackend(name, maxsize, ttl)
+
+product_cache_ttl = float(os.getenv("PRODUCT_CACHE_TTL", "5"))
+product_cache = make_backend(os.getenv("CACHE_URL", "memory://"), "products", int(os.getenv("PRODUCT_CACHE_SIZE", "10000")), product_cache_ttl)
+search_cache_ttl = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+search_cache = make_backend(os.getenv("CACHE_URL", "memory://"), "search", int(os.getenv("SEARCH_CACHE_SIZE", "1000")), search_cache_ttl)
+
+
+def product_key(product_id: int) -> str:
+    return f"product:{product_id}"
+
+def catalog_key(query: BaseModel) -> str:
+    return f"catalog:{product_cache.version('catalog:version')}:{query.model_dump_json()}"
+
+def cached_bytes(key: str, loader: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+    value = product_cache.get(key)
+    if value is None:
+        value = loader()
+        if value is not None:
+            product_cache.set(key, value, product_cache_ttl)
+    return value
+
+def cached_search(match: str, loader: Callable[[], bytes]) -> bytes:
+    key = f"search:{match}"
+    value = search_cache.get(key)
+    if value is None:
+        value = loader()
+        search_cache.set(key, value, search_cache_ttl)
+    return value
+
+async def acached_bytes(key: str, loader: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+    value = product_cache.get(key)
+    if value is None:
+        value = await loader()
+        if value is not None:
+            product_cache.set(key, value, product_cache_ttl)
+    return value
+
+def mark_products_changed(db: OrmSession, *product_ids: int, listing: bool = True):
+    db.info.setdefault("changed_products", set()).update(product_ids)
+    if listing:
+        db.info["catalog_changed"] = True
+
+@event.listens_for(OrmSession, "after_commit")
+def invalidate_changed_products(db: OrmSession):
+    product_ids = db.info.pop("changed_products", None)
+    catalog_changed = db.info.pop("catalog_changed", False)
+    try:
+        if product_ids:
+            product_cache.delete(*(product_key(product_id) for product_id in product_ids))
+        if catalog_changed:
+            product_cache.bump("catalog:version")
+    except Exception:
+        logger.exception("Could not invalidate cached products %s", sorted(product_ids or ()))
+
+@event.listens_for(OrmSession, "after_rollback")
+def discard_changed_products(db: OrmSession):
+    db.info.pop("changed_products", None)
+    db.info.pop("catalog_changed", None)
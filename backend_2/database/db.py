@@ -1,13 +1,208 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
 import os
+import time
 
-db_path = os.getenv("DB_PATH", "sqlite:///database.db")
+db_echo = os.getenv("DB_ECHO", "0") == "1"
+db_pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
+db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+sqlite_busy_timeout = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+sqlite_cache_size = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
 
-engine = create_engine(db_path, echo=True)
+
+class QueryStats:
+    __slots__ = ("queries", "sql_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def instrument_engine(sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        stats = query_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_time += time.perf_counter() - context._query_started
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def engine_options(url: str) -> dict:
+    options = {"echo": db_echo}
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=db_pool_size,
+            max_overflow=db_max_overflow,
+            pool_timeout=db_pool_timeout,
+            pool_recycle=db_pool_recycle,
+            pool_pre_ping=True,
+        )
+    return options
+
+def apply_sqlite_pragmas(sync_engine, read_only: bool = False):
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={sqlite_busy_timeout}")
+        cursor.execute(f"PRAGMA cache_size={sqlite_cache_size}")
+        cursor.execute(f"PRAGMA mmap_size={sqlite_mmap_size}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def make_engine(url: str, read_only: bool = False):
+    engine = create_engine(url, **engine_options(url))
+    if is_sqlite(url):
+        apply_sqlite_pragmas(engine, read_only)
+    instrument_engine(engine)
+    return engine
+
+def make_async_engine(url: str, read_only: bool = False):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    url = async_url(url)
+    engine = create_async_engine(url, **engine_options(url))
+    if is_sqlite(url):
+        apply_sqlite_pragmas(engine.sync_engine, read_only)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+def async_url(url: str) -> str:
+    driver, _, rest = url.partition("://")
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if driver in ("postgres", "postgresql", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+engines = {}
+
+
+def configure_engines(settings=None):
+    if settings is None:
+        from settings import Settings
+        settings = Settings()
+    for name in ("write", "read"):
+        if name in engines:
+            engines[name].dispose()
+    for name in ("async_write", "async_read"):
+        if name in engines:
+            engines[name].sync_engine.dispose(close=False)
+    engines.clear()
+    engines["settings"] = settings
+
+def engine_settings():
+    if "settings" not in engines:
+        configure_engines()
+    return engines["settings"]
+
+def get_engine():
+    if "write" not in engines:
+        engines["write"] = make_engine(engine_settings().db_path)
+    return engines["write"]
+
+def get_read_engine():
+    if "read" not in engines:
+        engines["read"] = make_engine(engine_settings().read_path, read_only=True)
+    return engines["read"]
+
+def get_async_engine():
+    if "async_write" not in engines:
+        engines["async_write"] = make_async_engine(engine_settings().db_path)
+    return engines["async_write"]
+
+def get_async_read_engine():
+    if "async_read" not in engines:
+        engines["async_read"] = make_async_engine(engine_settings().read_path, read_only=True)
+    return engines["async_read"]
+
+async def dispose_engines():
+    for name in ("write", "read"):
+        if name in engines:
+            engines.pop(name).dispose()
+    for name in ("async_write", "async_read"):
+        if name in engines:
+            await engines.pop(name).dispose()
+
+def __getattr__(name: str):
+    getter = {
+        "engine": get_engine,
+        "read_engine": get_read_engine,
+        "async_engine": get_async_engine,
+        "async_read_engine": get_async_read_engine,
+    }.get(name)
+    if getter is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getter()
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
+        yield session
+
+def get_read_session():
+    with Session(get_read_engine()) as session:
+        yield session
+
+def run_in_session(fn, *args):
+    with Session(get_engine()) as session:
+        return fn(session, *args)
+
+async def get_async_session():
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+async def get_async_read_session():
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    async with AsyncSession(get_async_read_engine(), expire_on_commit=False) as session:
         yield session
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(get_engine())
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+@contextmanager
+def count_queries(*binds, expected: int = None):
+    binds = binds or (get_engine(), get_read_engine())
+    counter = QueryCounter()
+    for bind in binds:
+        event.listen(bind, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for bind in binds:
+            event.remove(bind, "before_cursor_execute", counter)
+    if expected is not None and counter.count != expected:
+        raise AssertionError(
+            f"Expected {expected} queries, got {counter.count}:\n" + "\n".join(counter.statements)
+        )
@@ -1,9 +1,24 @@
-from typing import Optional, List, Literal
+from typing import Callable, Collection, NamedTuple, Optional, List, Literal, Tuple
+from datetime import datetime, timezone
 from sqlmodel import SQLModel, Field, Relationship, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Index, Numeric, bindparam, case, cast, delete, false, event, func, insert, inspect, literal, text, tuple_, union_all, update
+from sqlalchemy.exc import IntegrityError
 from enum import Enum
 from pydantic import EmailStr
-from schems.posts import CreateCartItem, CreateOrder, CreateUserOpen, CreateUser, CreateProduct, AuthUser
+from schems.posts import CreateCartItem, CreateOrder, CreateUserOpen, CreateUser, CreateProduct, AuthUser, CatalogQuery, ProductSort, SearchQuery, ArchiveQuery
+from schems.posts import Checkout, CheckoutItemResult, CheckoutResult, BulkTransitionResult, FlashSale
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from database.db import run_in_session
+from cache import cached_search, mark_products_changed
+from events import order_event, publish_after_commit
+import base64
+import orjson
+import os
+import random
+import json
+import re
 
 
 class Role(str, Enum):
@@ -18,6 +33,25 @@ class OrderStatus(str, Enum):
     confirmed = "confirmed"
     cancelled = "cancelled"
 
+EXPIRABLE_STATUSES = (OrderStatus.created, OrderStatus.acknowledged)
+TERMINAL_STATUSES = (OrderStatus.confirmed, OrderStatus.cancelled)
+MONEY_EPSILON = 1e-9
+MONEY_DIGITS = 6
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def money(value) -> float:
+    return max(round(value, MONEY_DIGITS), 0.0)
+
+def subtract_money(column, amount: float):
+    return case((column > amount, column - amount), else_=0.0)
+
+def begin_write(db: Session):
+    connection = db.connection()
+    if connection.dialect.name == "sqlite" and not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     email: EmailStr = Field(index=True, nullable=False, unique=True)
@@ -36,17 +70,32 @@ class User(SQLModel, table=True):
         sa_relationship_kwargs={"foreign_keys": "[Order.buyer_id]"}
     )
     @classmethod
-    def get_token(cls, db: Session, user: "AuthUser") -> str:
-        from utils import verify_password, generate_token
-        db_user = cls.get_by_email(db, user.email)
+    async def aget_token(cls, user: "AuthUser") -> str:
+        from utils import averify_password, generate_token, needs_rehash, ahash_password
+        db_user = await run_in_threadpool(run_in_session, cls.get_by_email, user.email)
         if not db_user:
             raise HTTPException(status_code=404, detail="User not found.")
-        if not verify_password(user.password, db_user.password_hash):
+        if not await averify_password(user.password, db_user.password_hash):
             raise HTTPException(status_code=401, detail="Incorrect password.")
+        if needs_rehash(db_user.password_hash):
+            password_hash = await ahash_password(user.password)
+            await run_in_threadpool(run_in_session, cls.set_password_hash, db_user.id, password_hash)
         return generate_token(db_user.id)
 
     @classmethod
-    def create_user(cls, db: Session, user: "CreateUserOpen"):
+    def set_password_hash(cls, db: Session, user_id: int, password_hash: str):
+        db.exec(update(cls).where(cls.id == user_id).values(password_hash=password_hash))
+        db.commit()
+
+    @classmethod
+    async def acreate_user(cls, user: "CreateUserOpen"):
+        from utils import ahash_password
+        await run_in_threadpool(run_in_session, cls.check_new_user, user)
+        password_hash = await ahash_password(user.password)
+        await run_in_threadpool(run_in_session, cls.create_user, user, password_hash)
+
+    @classmethod
+    def check_new_user(cls, db: Session, user: "CreateUserOpen"):
         if cls.get_by_email(db, user.email):
             raise HTTPException(
                 status_code=400,
@@ -57,7 +106,11 @@ class User(SQLModel, table=True):
                 status_code=400,
                 detail="User with this name already exists."
             )
-        user_instance = User(**CreateUser.from_create_user_open(user).model_dump())
+
+    @classmethod
+    def create_user(cls, db: Session, user: "CreateUserOpen", password_hash: Optional[str] = None):
+        cls.check_new_user(db, user)
+        user_instance = User(**CreateUser.from_create_user_open(user, password_hash).model_dump())
 
         db.add(user_instance)
         db.commit()
@@ -78,21 +131,24 @@ class User(SQLModel, table=True):
         return db.get(cls, user_id)
 
     def freeze(self, db: Session, amount: float):
-        if amount > self.wallet.balance:
+        result = db.exec(
+            update(Wallet)
+            .where(Wallet.user_id == self.id, Wallet.balance >= amount - MONEY_EPSILON)
+            .values(balance=subtract_money(Wallet.balance, amount), frozen=Wallet.frozen + amount)
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount != 1:
             raise HTTPException(status_code=400, detail="Insufficient balance to freeze the amount.")
-        self.wallet.frozen += amount
-        self.wallet.balance -= amount
-        db.add(self.wallet)
-        db.commit()
-        db.refresh(self.wallet)
     
     def unfreeze(self, db: Session, amount: float):
-        if amount > self.wallet.frozen:
+        result = db.exec(
+            update(Wallet)
+            .where(Wallet.user_id == self.id, Wallet.frozen >= amount - MONEY_EPSILON)
+            .values(frozen=subtract_money(Wallet.frozen, amount), balance=Wallet.balance + amount)
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount != 1:
             raise ValueError("Insufficient frozen amount to unfreeze.")
-        self.wallet.frozen -= amount
-        self.wallet.balance += amount
-        db.add(self.wallet)
-        db.commit()
            
     def add_balance(self, db: Session, amount: float):
         if amount < 0:
@@ -103,11 +159,33 @@ class User(SQLModel, table=True):
         
     def add_product(self, db: Session, product: "CreateProduct"):
         db.add(Product(**product.model_dump(), seller_id=self.id))
+        mark_products_changed(db)
         db.commit()
+
+    def add_products(self, db: Session, products: List["CreateProduct"]):
+        try:
+            db.exec(insert(Product), params=[{**product.model_dump(), "seller_id": self.id, "reserved": 0} for product in products])
+            mark_products_changed(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    def owned_product(self, db: Session, product_id: int) -> "Product":
+        product = db.get(Product, product_id)
+        if not product or product.seller_id != self.id:
+            raise HTTPException(status_code=404, detail="Product not found or does not belong to the user.")
+        return product
+
+    def start_flash_sale(self, db: Session, product_id: int, flash_sale: "FlashSale"):
+        self.owned_product(db, product_id).start_flash_sale(db, flash_sale.shards)
+
+    def end_flash_sale(self, db: Session, product_id: int):
+        self.owned_product(db, product_id).end_flash_sale(db)
     
     def add_cart_item(self, db: Session, cart_item: "CreateCartItem"):
         product = db.get(Product, cart_item.product_id)
-        if not product or cart_item.quantity > product.stock:
+        if not product or cart_item.quantity > product.available_stock(db):
             raise HTTPException(status_code=400, detail="Insufficient product stock.")
         db.add(CartItem(**cart_item.model_dump(), buyer_id=self.id))
         db.commit()
@@ -120,93 +198,276 @@ class User(SQLModel, table=True):
         db.commit()
 
     def transaction(self, db: Session, amount: float, seller: "User"):
-        self.wallet.frozen -= amount
-        seller.wallet.balance += amount
-        db.add(self.wallet)
-        db.add(seller.wallet)
-        db.commit()
-        db.refresh(self.wallet)
-        db.refresh(seller.wallet)
+        result = db.exec(
+            update(Wallet)
+            .where(Wallet.user_id == self.id, Wallet.frozen >= amount - MONEY_EPSILON)
+            .values(frozen=subtract_money(Wallet.frozen, amount))
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount != 1:
+            raise ValueError("Insufficient frozen amount to pay the seller.")
+        db.exec(
+            update(Wallet)
+            .where(Wallet.user_id == seller.id)
+            .values(balance=Wallet.balance + amount)
+            .execution_options(synchronize_session="fetch")
+        )
 
     def create_order(self, db: Session, order: "CreateOrder"):
-        cart_item = db.get(CartItem, order.cart_item_id)
-        if not cart_item or cart_item.buyer_id != self.id:
+        cart_item = db.exec(
+            select(CartItem).where(CartItem.id == order.cart_item_id, CartItem.buyer_id == self.id)
+        ).first()
+        if not cart_item:
             raise HTTPException(status_code=400, detail="Cart item not found or does not belong to the user.")
-        if cart_item.quantity > cart_item.product.stock:
-            raise HTTPException(status_code=400, detail="Insufficient product stock.")
+        product = cart_item.product
+        quantity = cart_item.quantity
+        total_price = product.price * quantity
 
-        total_price = cart_item.product.price * cart_item.quantity
-        if self.wallet.balance < total_price:
-            raise HTTPException(status_code=400, detail="Insufficient balance to create the order.")
+        try:
+            claimed = db.exec(delete(CartItem).where(CartItem.id == cart_item.id, CartItem.buyer_id == self.id))
+            if claimed.rowcount != 1:
+                raise HTTPException(status_code=400, detail="Cart item not found or does not belong to the user.")
+            counted = product.reserve(db, quantity, total_price)
+            self.freeze(db, total_price)
+            created = Order(
+                buyer_id=self.id,
+                seller_id=product.seller_id,
+                product_id=product.id,
+                quantity=quantity,
+                total_price=total_price
+            )
+            db.add(created)
+            db.flush()
+            publish_after_commit(db, order_event(created.id, OrderStatus.created, self.id, product.seller_id))
+            if not counted:
+                SellerStat.record(db, product.seller_id, OrderStatus.created, 1, total_price)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
 
-        self.freeze(db, total_price)
-        cart_item.product.reserve(db, cart_item.quantity)
-        
-        order_instance = Order(
-            buyer_id=self.id,
-            seller_id=cart_item.product.seller_id,
-            product_id=cart_item.product_id,
-            quantity=cart_item.quantity,
-            total_price=total_price
+    def checkout(self, db: Session, checkout: "Checkout") -> "CheckoutResult":
+        begin_write(db)
+        statement = (
+            select(CartItem, Product)
+            .join(Product, Product.id == CartItem.product_id)
+            .where(CartItem.buyer_id == self.id)
         )
-        db.add(order_instance)
-        db.delete(cart_item)
-        db.commit()
-    
-    def order_acknowledged(self, db: Session, order_id: int):
+        if checkout.cart_item_ids is not None:
+            statement = statement.where(CartItem.id.in_(checkout.cart_item_ids))
+        rows = db.exec(statement.order_by(CartItem.id).with_for_update()).all()
+
+        found = {cart_item.id for cart_item, _ in rows}
+        results = {
+            cart_item_id: CheckoutItemResult(
+                cart_item_id=cart_item_id, success=False,
+                detail="Cart item not found or does not belong to the user."
+            )
+            for cart_item_id in checkout.cart_item_ids or [] if cart_item_id not in found
+        }
+        balance = db.exec(select(Wallet.balance).where(Wallet.user_id == self.id).with_for_update()).one()
+        stock = {product.id: product.stock for _, product in rows}
+        orders, uncounted = [], {}
+        try:
+            for cart_item, product in rows:
+                total_price = product.price * cart_item.quantity
+                if not product.flash_sale and cart_item.quantity > stock[product.id]:
+                    detail = "Insufficient product stock."
+                elif total_price > balance + MONEY_EPSILON:
+                    detail = "Insufficient balance to create the order."
+                else:
+                    detail, counted = self.checkout_item(db, cart_item, product, total_price)
+                if detail is None:
+                    stock[product.id] -= cart_item.quantity
+                    balance -= total_price
+                    orders.append({
+                        "buyer_id": self.id,
+                        "seller_id": product.seller_id,
+                        "product_id": product.id,
+                        "quantity": cart_item.quantity,
+                        "total_price": total_price,
+                        "status": OrderStatus.created,
+                    })
+                    if not counted:
+                        count, revenue = uncounted.get(product.seller_id, (0, 0.0))
+                        uncounted[product.seller_id] = (count + 1, revenue + total_price)
+                results[cart_item.id] = CheckoutItemResult(cart_item_id=cart_item.id, success=detail is None, detail=detail)
+
+            if orders:
+                self.freeze(db, sum(order["total_price"] for order in orders))
+                rows = db.exec(insert(Order).returning(Order.id, Order.seller_id), params=orders).all()
+                publish_after_commit(db, *(order_event(order_id, OrderStatus.created, self.id, seller_id) for order_id, seller_id in rows))
+                for seller_id, (count, revenue) in sorted(uncounted.items()):
+                    SellerStat.record(db, seller_id, OrderStatus.created, count, revenue)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return CheckoutResult(
+            results=sorted(results.values(), key=lambda result: result.cart_item_id),
+            total_price=sum(order["total_price"] for order in orders)
+        )
+
+    def checkout_item(self, db: Session, cart_item: "CartItem", product: "Product", total_price: float) -> Tuple[Optional[str], bool]:
+        try:
+            with db.begin_nested():
+                claimed = db.exec(delete(CartItem).where(CartItem.id == cart_item.id, CartItem.buyer_id == self.id))
+                if claimed.rowcount != 1:
+                    raise HTTPException(status_code=409, detail="Cart item was removed during checkout.")
+                counted = product.reserve(db, cart_item.quantity, total_price)
+        except HTTPException as e:
+            return e.detail, False
+        return None, counted
+
+    def settle_order(self, db: Session, order: "Order"):
+        order.product.unreserve(db, order.quantity)
+        self.transaction(db, order.total_price, order.seller)
+
+    def release_order(self, db: Session, order: "Order"):
+        order.product.restock(db, order.quantity)
+        self.unfreeze(db, order.total_price)
+
+    def transition_order(self, db: Session, order_id: int, status: OrderStatus):
+        transition = ORDER_TRANSITIONS[status]
         order = db.get(Order, order_id)
-        if not order or order.seller_id != self.id:
+        if not order or getattr(order, transition.owner) != self.id:
             raise HTTPException(status_code=404, detail="Order not found or does not belong to the user.")
-        if order.status != OrderStatus.created:
-            raise HTTPException(status_code=400, detail="Order cannot be acknowledged in its current state.")
-        order.status = OrderStatus.acknowledged
-        db.add(order) 
-        db.commit()
-    
+        if order.status not in transition.sources:
+            raise HTTPException(status_code=400, detail=f"Order cannot be {status.value} in its current state.")
+        previous_status = order.status
+        try:
+            claimed = db.exec(
+                update(Order)
+                .where(Order.id == order.id, Order.status == previous_status)
+                .values(status=status, updated_at=utcnow())
+                .execution_options(synchronize_session="fetch")
+            )
+            if claimed.rowcount != 1:
+                raise HTTPException(status_code=409, detail="Order status changed concurrently, please retry.")
+            if transition.effect:
+                transition.effect(self, db, order)
+            SellerStat.move(db, order.seller_id, previous_status, status, order.total_price)
+            publish_after_commit(db, order_event(order.id, status, order.buyer_id, order.seller_id, previous_status))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    def bulk_transition_orders(self, db: Session, order_ids: List[int], status: OrderStatus) -> "BulkTransitionResult":
+        transition = ORDER_TRANSITIONS.get(status)
+        if not transition or transition.effect or len(transition.sources) != 1 or transition.owner != f"{self.role.value}_id":
+            raise HTTPException(status_code=400, detail=f"Orders cannot be {status.value} in bulk.")
+        source = transition.sources[0]
+        requested = sorted(set(order_ids))
+        try:
+            rows = db.exec(
+                update(Order)
+                .where(Order.id.in_(requested), getattr(Order, transition.owner) == self.id, Order.status == source)
+                .values(status=status, updated_at=utcnow())
+                .returning(Order.id, Order.buyer_id, Order.seller_id, Order.total_price)
+                .execution_options(synchronize_session=False)
+            ).all()
+            moved = {}
+            for order_id, buyer_id, seller_id, total_price in rows:
+                publish_after_commit(db, order_event(order_id, status, buyer_id, seller_id, source))
+                count, revenue = moved.get(seller_id, (0, 0.0))
+                moved[seller_id] = (count + 1, revenue + total_price)
+            for seller_id, (count, revenue) in sorted(moved.items()):
+                SellerStat.move(db, seller_id, source, status, revenue, count)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        updated = {row[0] for row in rows}
+        return BulkTransitionResult(
+            status=status,
+            updated=sorted(updated),
+            rejected=[order_id for order_id in requested if order_id not in updated]
+        )
+
+    def order_acknowledged(self, db: Session, order_id: int):
+        self.transition_order(db, order_id, OrderStatus.acknowledged)
+
     def order_shipped(self, db: Session, order_id: int):
-        order = db.get(Order, order_id)
-        if not order or order.seller_id != self.id:
-            raise HTTPException(status_code=404, detail="Order not found or does not belong to the user.")
-        if order.status != OrderStatus.acknowledged:
-            raise HTTPException(status_code=400, detail="Order cannot be shipped in its current state.")
-        order.status = OrderStatus.shipped
-        db.add(order)
-        db.commit()
-    
+        self.transition_order(db, order_id, OrderStatus.shipped)
+
     def order_received(self, db: Session, order_id: int):
-        order = db.get(Order, order_id)
-        if not order or order.buyer_id != self.id:
-            raise HTTPException(status_code=404, detail="Order not found or does not belong to the user.")
-        if order.status != OrderStatus.shipped:
-            raise HTTPException(status_code=400, detail="Order cannot be received in its current state.")
-        order.status = OrderStatus.received
-        db.add(order)
-        db.commit()
-    
+        self.transition_order(db, order_id, OrderStatus.received)
+
     def order_confirmed(self, db: Session, order_id: int):
-        order = db.get(Order, order_id)
-        if not order or order.buyer_id != self.id:
-            raise HTTPException(status_code=404, detail="Order not found or does not belong to the user.")
-        if order.status != OrderStatus.received:
-            raise HTTPException(status_code=400, detail="Order cannot be confirmed in its current state.")
-        order.status = OrderStatus.confirmed
-        order.product.unreserve(db, order.quantity)
-        self.transaction(db, order.total_price, order.seller)
-        db.add(order)
-        db.commit()
+        self.transition_order(db, order_id, OrderStatus.confirmed)
 
     def order_cancelled(self, db: Session, order_id: int):
-        order = db.get(Order, order_id)
-        if not order or order.buyer_id != self.id:
-            raise HTTPException(status_code=404, detail="Order not found or does not belong to the user.")
-        if order.status in [OrderStatus.confirmed, OrderStatus.cancelled]:
-            raise HTTPException(status_code=400, detail="Order cannot be cancelled in its current state.")
-        order.status = OrderStatus.cancelled
-        order.product.unreserve(db, order.quantity)
-        self.unfreeze(db, order.total_price)
-        db.add(order)
-        db.commit()
+        self.transition_order(db, order_id, OrderStatus.cancelled)
+
+    @classmethod
+    async def aget_by_id(cls, db: AsyncSession, user_id: int) -> Optional["User"]:
+        return await db.get(cls, user_id)
 
+    async def aadd_balance(self, db: AsyncSession, amount: float):
+        await db.run_sync(self.add_balance, amount)
+
+    async def aadd_product(self, db: AsyncSession, product: "CreateProduct"):
+        await db.run_sync(self.add_product, product)
+
+    async def aadd_cart_item(self, db: AsyncSession, cart_item: "CreateCartItem"):
+        await db.run_sync(self.add_cart_item, cart_item)
+
+    async def adelete_cart_item(self, db: AsyncSession, cart_item_id: int):
+        await db.run_sync(self.delete_cart_item, cart_item_id)
+
+    async def acreate_order(self, db: AsyncSession, order: "CreateOrder"):
+        await db.run_sync(self.create_order, order)
+
+    async def acheckout(self, db: AsyncSession, checkout: "Checkout") -> "CheckoutResult":
+        return await db.run_sync(self.checkout, checkout)
+
+    async def aorder_acknowledged(self, db: AsyncSession, order_id: int):
+        await db.run_sync(self.order_acknowledged, order_id)
+
+    async def aorder_shipped(self, db: AsyncSession, order_id: int):
+        await db.run_sync(self.order_shipped, order_id)
+
+    async def aorder_received(self, db: AsyncSession, order_id: int):
+        await db.run_sync(self.order_received, order_id)
+
+    async def aorder_confirmed(self, db: AsyncSession, order_id: int):
+        await db.run_sync(self.order_confirmed, order_id)
+
+    async def aorder_cancelled(self, db: AsyncSession, order_id: int):
+        await db.run_sync(self.order_cancelled, order_id)
+
+    async def abulk_transition_orders(self, db: AsyncSession, order_ids: List[int], status: OrderStatus) -> "BulkTransitionResult":
+        return await db.run_sync(self.bulk_transition_orders, order_ids, status)
+
+
+class OrderTransition(NamedTuple):
+    owner: str
+    sources: Tuple[OrderStatus, ...]
+    effect: Optional[Callable[[User, Session, "Order"], None]] = None
+
+ORDER_TRANSITIONS = {
+    OrderStatus.acknowledged: OrderTransition("seller_id", (OrderStatus.created,)),
+    OrderStatus.shipped: OrderTransition("seller_id", (OrderStatus.acknowledged,)),
+    OrderStatus.received: OrderTransition("buyer_id", (OrderStatus.shipped,)),
+    OrderStatus.confirmed: OrderTransition("buyer_id", (OrderStatus.received,), User.settle_order),
+    OrderStatus.cancelled: OrderTransition(
+        "buyer_id",
+        (OrderStatus.created, OrderStatus.acknowledged, OrderStatus.shipped, OrderStatus.received),
+        User.release_order
+    ),
+}
+
+@event.listens_for(User, "after_update")
+def invalidate_user_on_role_change(mapper, connection, target: User):
+    if inspect(target).attrs.role.history.has_changes():
+        from utils import invalidate_user
+        invalidate_user(target.id)
+
+@event.listens_for(User, "after_delete")
+def invalidate_user_on_delete(mapper, connection, target: User):
+    from utils import invalidate_user
+    invalidate_user(target.id)
 
 class Wallet(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -215,7 +476,29 @@ class Wallet(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id")
     user: User = Relationship(back_populates="wallet")
     
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, length: int = 1) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    *keys, last_id = values
+    if type(last_id) is not int or any(type(value) not in (int, float) for value in keys):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return values
+
 class Product(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_product_price_id", "price", "id"),
+        Index("ix_product_seller_id_id", "seller_id", "id"),
+        Index("ix_product_seller_id_price_id", "seller_id", "price", "id"),
+        Index("ix_product_in_stock_id", "id", sqlite_where=text("stock > 0"), postgresql_where=text("stock > 0")),
+        Index("ix_product_in_stock_price_id", "price", "id", sqlite_where=text("stock > 0"), postgresql_where=text("stock > 0")),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     seller_id: int = Field(foreign_key="user.id")
     seller: User = Relationship(back_populates="products")
@@ -226,21 +509,378 @@ class Product(SQLModel, table=True):
     price: float
     stock: int
     reserved: int = Field(default=0)
+    flash_sale: bool = Field(default=False, sa_column_kwargs={"server_default": false()})
 
-    def reserve(self, db: Session, quantity: int):
-        if quantity > self.stock:
-            raise ValueError("Insufficient product stock.")
-        self.reserved += quantity
-        self.stock -= quantity
-        db.add(self)
-        db.commit()
+    @classmethod
+    def get_page(cls, db: Session, query: CatalogQuery) -> Tuple[List["Product"], Optional[str]]:
+        statement = select(cls)
+        if query.min_price is not None:
+            statement = statement.where(cls.price >= query.min_price)
+        if query.max_price is not None:
+            statement = statement.where(cls.price <= query.max_price)
+        if query.seller_id is not None:
+            statement = statement.where(cls.seller_id == query.seller_id)
+        if query.in_stock is True:
+            statement = statement.where(cls.stock > 0)
+        elif query.in_stock is False:
+            statement = statement.where(cls.stock == 0)
+
+        by_price = query.sort in (ProductSort.price_asc, ProductSort.price_desc)
+        descending = query.sort in (ProductSort.newest, ProductSort.price_desc)
+        key = tuple_(cls.price, cls.id) if by_price else tuple_(cls.id)
+        if query.cursor is not None:
+            values = decode_cursor(query.cursor, 2 if by_price else 1)
+            statement = statement.where(key < tuple_(*values) if descending else key > tuple_(*values))
+        columns = (cls.price, cls.id) if by_price else (cls.id,)
+        statement = statement.order_by(*(column.desc() if descending else column.asc() for column in columns))
+
+        products = db.exec(statement.limit(query.limit + 1)).all()
+        if len(products) <= query.limit:
+            return products, None
+        products = products[:query.limit]
+        last = products[-1]
+        return products, encode_cursor([last.price, last.id] if by_price else [last.id])
+
+    @classmethod
+    async def aget_page(cls, db: AsyncSession, query: CatalogQuery) -> Tuple[List["Product"], Optional[str]]:
+        return await db.run_sync(cls.get_page, query)
+
+    @classmethod
+    def search(cls, db: Session, query: SearchQuery) -> List[dict]:
+        terms = re.findall(r"\w+", query.q)
+        if not terms:
+            return []
+        last = "{}*" if query.prefix else "{}"
+        if db.get_bind().dialect.name == "postgresql":
+            ranking, hits, match = POSTGRES_SEARCH_RANKING, POSTGRES_SEARCH_HITS, " & ".join(terms[:-1] + [(last.replace("*", ":*")).format(terms[-1])])
+        else:
+            ranking, hits, match = SQLITE_SEARCH_RANKING, SQLITE_SEARCH_HITS, " ".join([f'"{term}"' for term in terms[:-1]] + [last.format(f'"{terms[-1]}"')])
+
+        def rank(after: int, upto: int, stock: str = "", limit: int = SEARCH_RANKED) -> list:
+            join = "JOIN product ON product.id = product_fts.rowid" if stock else ""
+            rows = db.exec(text(ranking.format(join=join, stock=stock)), params={"match": match, "after": after, "upto": upto, "limit": limit}).all()
+            return [list(row) for row in rows]
+
+        upto = db.exec(select(func.coalesce(func.max(cls.id), 0))).one()
+        cached = orjson.loads(cached_search(match, lambda: orjson.dumps({"upto": upto, "ranked": rank(0, upto)})))
+        ranked, complete = cached["ranked"], len(cached["ranked"]) < SEARCH_RANKED
+        if upto > cached["upto"]:
+            added = rank(cached["upto"], upto)
+            complete = complete and len(added) < SEARCH_RANKED
+            ranked = sorted(ranked + added, key=lambda row: -row[1])[:SEARCH_RANKED]
+        if query.in_stock is not None:
+            stock = {True: "AND product.stock > 0", False: "AND product.stock = 0"}[query.in_stock]
+            kept = set(db.exec(
+                text(f"SELECT product.id FROM product WHERE product.id IN :ids {stock}").bindparams(bindparam("ids", expanding=True)),
+                params={"ids": [product_id for product_id, _ in ranked]}
+            ).scalars())
+            ranked = [row for row in ranked if row[0] in kept]
+            if not complete and len(ranked) < query.offset + query.limit:
+                ranked = rank(0, upto, stock, query.offset + query.limit)
+        page = ranked[query.offset:query.offset + query.limit]
+        if not page:
+            return []
+        ids = [product_id for product_id, _ in page]
+        rows = db.exec(
+            text(hits).bindparams(bindparam("ids", expanding=True)),
+            params={"match": match, "first": min(ids), "last": max(ids), "ids": ids}
+        ).mappings().all()
+        found = {row["id"]: row for row in rows}
+        return [{**found[product_id], "score": score} for product_id, score in page if product_id in found]
+
+    @classmethod
+    async def asearch(cls, db: AsyncSession, query: SearchQuery) -> List[dict]:
+        return await db.run_sync(cls.search, query)
+
+    @classmethod
+    def export_statement(cls):
+        return select(cls.id, cls.seller_id, cls.name, cls.description, cls.price, cls.stock).order_by(cls.id)
+
+    def available_stock(self, db: Session) -> int:
+        if self.flash_sale:
+            return ProductStockShard.available(db, self.id)
+        return self.stock
+
+    # True when the order was counted on a flash-sale shard, so the caller must not record it in SellerStat.
+    def reserve(self, db: Session, quantity: int, revenue: float) -> bool:
+        if self.flash_sale:
+            return ProductStockShard.reserve(db, self.id, quantity, revenue)
+        result = db.exec(
+            update(Product)
+            .where(Product.id == self.id, Product.stock >= quantity, Product.flash_sale == False)
+            .values(stock=Product.stock - quantity, reserved=Product.reserved + quantity)
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount != 1:
+            if db.exec(select(Product.flash_sale).where(Product.id == self.id)).first():
+                return ProductStockShard.reserve(db, self.id, quantity, revenue)
+            raise HTTPException(status_code=400, detail="Insufficient product stock.")
+        mark_products_changed(db, self.id, listing=self.stock == 0)
+        return False
     
     def unreserve(self, db: Session, quantity: int):
-        if quantity > self.reserved:
+        statement = (
+            update(Product)
+            .where(Product.id == self.id, Product.reserved >= quantity)
+            .values(reserved=Product.reserved - quantity)
+            .execution_options(synchronize_session="fetch")
+        )
+        result = db.exec(statement)
+        if result.rowcount != 1 and ProductStockShard.flush(db, self.id):
+            result = db.exec(statement)
+        if result.rowcount != 1:
             raise ValueError("Insufficient reserved stock to unreserve.")
-        self.reserved -= quantity
-        db.add(self)
-        db.commit()
+        mark_products_changed(db, self.id, listing=False)
+
+    def restock(self, db: Session, quantity: int):
+        self.unreserve(db, quantity)
+        if self.flash_sale:
+            db.exec(
+                update(ProductStockShard)
+                .where(ProductStockShard.product_id == self.id, ProductStockShard.shard == 0)
+                .values(stock=ProductStockShard.stock + quantity)
+                .execution_options(synchronize_session=False)
+            )
+        db.exec(
+            update(Product)
+            .where(Product.id == self.id)
+            .values(stock=Product.stock + quantity)
+            .execution_options(synchronize_session="fetch")
+        )
+        mark_products_changed(db, self.id, listing=self.stock == quantity)
+
+    def start_flash_sale(self, db: Session, shards: int):
+        try:
+            result = db.exec(
+                update(Product)
+                .where(Product.id == self.id, Product.flash_sale == False)
+                .values(flash_sale=True)
+                .returning(Product.stock)
+                .execution_options(synchronize_session=False)
+            )
+            stock = result.scalar_one_or_none()
+            if stock is None:
+                raise HTTPException(status_code=400, detail="Flash sale is already active.")
+            db.exec(insert(ProductStockShard), params=[
+                {"product_id": self.id, "shard": shard, "stock": stock // shards + (1 if shard < stock % shards else 0), "reserved": 0}
+                for shard in range(shards)
+            ])
+            mark_products_changed(db, self.id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        db.refresh(self)
+
+    def end_flash_sale(self, db: Session):
+        try:
+            shards = db.exec(
+                select(ProductStockShard)
+                .where(ProductStockShard.product_id == self.id)
+                .with_for_update()
+            ).all()
+            result = db.exec(
+                update(Product)
+                .where(Product.id == self.id, Product.flash_sale == True)
+                .values(
+                    flash_sale=False,
+                    stock=sum(shard.stock for shard in shards),
+                    reserved=Product.reserved + sum(shard.reserved for shard in shards)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                raise HTTPException(status_code=400, detail="Flash sale is not active.")
+            orders = sum(shard.orders for shard in shards)
+            if orders:
+                SellerStat.record(db, self.seller_id, OrderStatus.created, orders, sum(shard.revenue for shard in shards))
+            db.exec(delete(ProductStockShard).where(ProductStockShard.product_id == self.id))
+            mark_products_changed(db, self.id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        db.refresh(self)
+
+# Every page SearchQuery allows (offset <= 1000, limit <= 50) falls inside the first SEARCH_RANKED hits.
+SEARCH_RANKED = 1050
+
+SQLITE_SEARCH_RANKING = """
+SELECT product_fts.rowid, -product_fts.rank
+FROM product_fts {join}
+WHERE product_fts MATCH :match AND product_fts.rowid > :after AND product_fts.rowid <= :upto {stock}
+ORDER BY product_fts.rank LIMIT :limit
+"""
+
+SQLITE_SEARCH_HITS = """
+SELECT product.id, product.name, product.description, product.price, product.stock,
+    highlight(product_fts, 0, '<mark>', '</mark>') AS name_highlight,
+    snippet(product_fts, 1, '<mark>', '</mark>', '...', 16) AS description_snippet
+FROM product_fts JOIN product ON product.id = product_fts.rowid
+WHERE product_fts MATCH :match AND product_fts.rowid BETWEEN :first AND :last AND +product_fts.rowid IN :ids
+"""
+
+POSTGRES_SEARCH_RANKING = """
+SELECT product.id, ts_rank_cd(product.search, query) AS score
+FROM product, to_tsquery('simple', :match) AS query
+WHERE product.search @@ query AND product.id > :after AND product.id <= :upto {stock}
+ORDER BY score DESC, product.id LIMIT :limit
+"""
+
+POSTGRES_SEARCH_HITS = """
+SELECT product.id, product.name, product.description, product.price, product.stock,
+    ts_headline('simple', product.name, query, 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true') AS name_highlight,
+    ts_headline('simple', coalesce(product.description, ''), query, 'StartSel=<mark>, StopSel=</mark>, MaxWords=16, MinWords=8') AS description_snippet
+FROM product, to_tsquery('simple', :match) AS query
+WHERE product.id BETWEEN :first AND :last AND product.id IN :ids
+"""
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE product_fts USING fts5(name, description, content='product', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "INSERT INTO product_fts(product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "INSERT INTO product_fts(product_fts) VALUES ('rebuild')",
+    """CREATE TRIGGER product_fts_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER product_fts_delete AFTER DELETE ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    """CREATE TRIGGER product_fts_update AFTER UPDATE OF name, description ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+POSTGRES_SEARCH_DDL = [
+    """ALTER TABLE product ADD COLUMN IF NOT EXISTS search tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') || setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_product_search ON product USING GIN (search)",
+]
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def create_product_search(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        statements = POSTGRES_SEARCH_DDL
+    elif connection.dialect.name == "sqlite":
+        if connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'product_fts'").first():
+            return
+        statements = SQLITE_SEARCH_DDL
+    else:
+        return
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+# During a flash sale Product.stock is only refreshed by flush(): the scheduler's
+# flush_flash_sales job, unreserve() and end_flash_sale(). Run with SCHEDULER_ENABLED=1
+# to keep catalog stock current; cart checks read the shards directly.
+class ProductStockShard(SQLModel, table=True):
+    product_id: int = Field(foreign_key="product.id", primary_key=True)
+    shard: int = Field(primary_key=True)
+    stock: int = Field(default=0)
+    reserved: int = Field(default=0)
+    # Created orders and their revenue, folded into SellerStat by flush() instead of per order.
+    orders: int = Field(default=0)
+    revenue: float = Field(default=0.0)
+
+    @classmethod
+    def available(cls, db: Session, product_id: int) -> int:
+        return db.exec(select(func.coalesce(func.sum(cls.stock), 0)).where(cls.product_id == product_id)).one()
+
+    @classmethod
+    def take(cls, db: Session, product_id: int, shard: int, quantity: int, orders: int = 0, revenue: float = 0.0) -> bool:
+        result = db.exec(
+            update(cls)
+            .where(cls.product_id == product_id, cls.shard == shard, cls.stock >= quantity)
+            .values(stock=cls.stock - quantity, reserved=cls.reserved + quantity, orders=cls.orders + orders, revenue=cls.revenue + revenue)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    @classmethod
+    def reserve(cls, db: Session, product_id: int, quantity: int, revenue: float) -> bool:
+        shards = list(db.exec(select(cls.shard).where(cls.product_id == product_id, cls.stock >= quantity)).all())
+        random.shuffle(shards)
+        for shard in shards:
+            if cls.take(db, product_id, shard, quantity, 1, revenue):
+                return True
+        shards = db.exec(
+            select(cls.shard, cls.stock)
+            .where(cls.product_id == product_id, cls.stock > 0)
+            .order_by(cls.shard)
+            .with_for_update()
+        ).all()
+        if sum(stock for _, stock in shards) < quantity:
+            raise HTTPException(status_code=400, detail="Insufficient product stock.")
+        orders = 1
+        for shard, stock in shards:
+            taken = min(stock, quantity)
+            if not cls.take(db, product_id, shard, taken, orders, revenue):
+                raise HTTPException(status_code=409, detail="Flash sale stock changed concurrently, please retry.")
+            orders, revenue = 0, 0.0
+            quantity -= taken
+            if not quantity:
+                return True
+
+    @classmethod
+    def flush(cls, db: Session, product_id: int) -> int:
+        begin_write(db)
+        shards = db.exec(
+            select(cls.shard, cls.stock, cls.reserved, cls.orders, cls.revenue)
+            .where(cls.product_id == product_id)
+            .order_by(cls.shard)
+            .with_for_update()
+        ).all()
+        if not shards:
+            return 0
+        pending, orders, revenue = 0, 0, 0.0
+        for shard, _, reserved, shard_orders, shard_revenue in shards:
+            if reserved or shard_orders:
+                db.exec(
+                    update(cls)
+                    .where(cls.product_id == product_id, cls.shard == shard)
+                    .values(reserved=cls.reserved - reserved, orders=cls.orders - shard_orders, revenue=cls.revenue - shard_revenue)
+                    .execution_options(synchronize_session=False)
+                )
+                pending += reserved
+                orders += shard_orders
+                revenue += shard_revenue
+        seller_id = db.exec(
+            update(Product)
+            .where(Product.id == product_id, Product.flash_sale == True)
+            .values(stock=sum(shard.stock for shard in shards), reserved=Product.reserved + pending)
+            .returning(Product.seller_id)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+        if orders:
+            SellerStat.record(db, seller_id, OrderStatus.created, orders, revenue)
+        mark_products_changed(db, product_id, listing=not any(shard.stock for shard in shards))
+        return pending
+
+    @classmethod
+    def pending_stats(cls, db: Session, seller_id: Optional[int] = None) -> List[tuple]:
+        statement = (
+            select(Product.seller_id, func.sum(cls.orders), func.sum(cls.revenue))
+            .join(Product, Product.id == cls.product_id)
+            .where(cls.orders != 0)
+            .group_by(Product.seller_id)
+        )
+        if seller_id is not None:
+            statement = statement.where(Product.seller_id == seller_id)
+        return db.exec(statement).all()
+
+    @classmethod
+    def flush_all(cls, db: Session) -> int:
+        flushed = 0
+        for product_id in db.exec(select(cls.product_id).distinct()).all():
+            try:
+                flushed += cls.flush(db, product_id)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        return flushed
+
 
 class CartItem(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -251,6 +891,11 @@ class CartItem(SQLModel, table=True):
     quantity: int
 
 class Order(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_order_status_created_at", "status", "created_at"),
+        Index("ix_order_status_updated_at", "status", "updated_at"),
+        {"sqlite_autoincrement": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     buyer_id: int = Field(foreign_key="user.id")
     buyer: User = Relationship(
@@ -267,9 +912,246 @@ class Order(SQLModel, table=True):
     quantity: int
     total_price: float
     status: OrderStatus = Field(default=OrderStatus.created)
-    
+    created_at: datetime = Field(default_factory=utcnow, nullable=False, sa_column_kwargs={"server_default": func.current_timestamp()})
+    updated_at: datetime = Field(default_factory=utcnow, nullable=False, sa_column_kwargs={"server_default": func.current_timestamp()})
 
+    @classmethod
+    def expirable_ids(cls, db: Session, cutoff: datetime, limit: int, exclude: Collection[int] = ()) -> List[int]:
+        order_ids = []
+        for status in EXPIRABLE_STATUSES:
+            if len(order_ids) >= limit:
+                break
+            statement = select(cls.id).where(cls.status == status, cls.created_at < cutoff)
+            if exclude:
+                statement = statement.where(cls.id.notin_(exclude))
+            order_ids += db.exec(statement.order_by(cls.created_at).limit(limit - len(order_ids))).all()
+        return order_ids
 
+    @classmethod
+    def expire(cls, db: Session, order_ids: List[int]) -> int:
+        reserved, frozen, moved = {}, {}, {}
+        try:
+            for status in EXPIRABLE_STATUSES:
+                rows = db.exec(
+                    update(cls)
+                    .where(cls.id.in_(order_ids), cls.status == status)
+                    .values(status=OrderStatus.cancelled, updated_at=utcnow())
+                    .returning(cls.id, cls.buyer_id, cls.seller_id, cls.product_id, cls.quantity, cls.total_price)
+                    .execution_options(synchronize_session=False)
+                ).all()
+                for order_id, buyer_id, seller_id, product_id, quantity, total_price in rows:
+                    publish_after_commit(db, order_event(order_id, OrderStatus.cancelled, buyer_id, seller_id, status))
+                    reserved[product_id] = reserved.get(product_id, 0) + quantity
+                    frozen[buyer_id] = frozen.get(buyer_id, 0.0) + total_price
+                    count, revenue = moved.get((seller_id, status), (0, 0.0))
+                    moved[(seller_id, status)] = (count + 1, revenue + total_price)
+            for product_id in sorted(reserved):
+                db.get(Product, product_id).restock(db, reserved[product_id])
+            for buyer_id in sorted(frozen):
+                db.get(User, buyer_id).unfreeze(db, frozen[buyer_id])
+            for (seller_id, status), (count, revenue) in sorted(moved.items()):
+                SellerStat.move(db, seller_id, status, OrderStatus.cancelled, revenue, count)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return sum(count for count, _ in moved.values())
 
-    
+    @classmethod
+    def seller_export_statement(cls, seller_id: int):
+        return (
+            select(
+                cls.id, cls.status, cls.product_id, Product.name.label("product_name"),
+                cls.buyer_id, cls.quantity, cls.total_price
+            )
+            .join(Product, Product.id == cls.product_id)
+            .where(cls.seller_id == seller_id)
+            .order_by(cls.id)
+        )
+
+
+class OrderArchive(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_orderarchive_buyer_id_id", "buyer_id", "id"),
+        Index("ix_orderarchive_seller_id_id", "seller_id", "id"),
+    )
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    buyer_id: int
+    seller_id: int
+    product_id: int
+    quantity: int
+    total_price: float
+    status: OrderStatus
+    created_at: datetime
+    updated_at: datetime
+    archived_at: datetime = Field(default_factory=utcnow, nullable=False)
+
+    @classmethod
+    def archivable_ids(cls, db: Session, cutoff: datetime, limit: int) -> List[int]:
+        order_ids = []
+        for status in TERMINAL_STATUSES:
+            if len(order_ids) >= limit:
+                break
+            statement = select(Order.id).where(Order.status == status, Order.updated_at < cutoff)
+            order_ids += db.exec(statement.order_by(Order.updated_at).limit(limit - len(order_ids))).all()
+        return order_ids
+
+    @classmethod
+    def archive(cls, db: Session, order_ids: List[int]) -> int:
+        columns = ["id", "buyer_id", "seller_id", "product_id", "quantity", "total_price", "status", "created_at", "updated_at"]
+        try:
+            db.exec(insert(cls).from_select(
+                columns + ["archived_at"],
+                select(*(getattr(Order, column) for column in columns), literal(utcnow()))
+                .where(Order.id.in_(order_ids), Order.status.in_(TERMINAL_STATUSES))
+            ))
+            result = db.exec(delete(Order).where(Order.id.in_(order_ids), Order.status.in_(TERMINAL_STATUSES)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return result.rowcount
+
+    @classmethod
+    def get_page(cls, db: Session, owner_column: str, owner_id: int, query: ArchiveQuery) -> Tuple[List["OrderArchive"], Optional[str]]:
+        statement = select(cls).where(getattr(cls, owner_column) == owner_id)
+        if query.cursor is not None:
+            values = decode_cursor(query.cursor)
+            statement = statement.where(cls.id < values[0])
+        orders = db.exec(statement.order_by(cls.id.desc()).limit(query.limit + 1)).all()
+        if len(orders) <= query.limit:
+            return orders, None
+        orders = orders[:query.limit]
+        return orders, encode_cursor([orders[-1].id])
+
+    @classmethod
+    async def aget_page(cls, db: AsyncSession, owner_column: str, owner_id: int, query: ArchiveQuery) -> Tuple[List["OrderArchive"], Optional[str]]:
+        return await db.run_sync(cls.get_page, owner_column, owner_id, query)
+
+class SellerStat(SQLModel, table=True):
+    seller_id: int = Field(foreign_key="user.id", primary_key=True)
+    status: OrderStatus = Field(primary_key=True)
+    count: int = Field(default=0, nullable=False)
+    revenue: float = Field(default=0.0, nullable=False)
+
+    @classmethod
+    def record(cls, db: Session, seller_id: int, status: OrderStatus, count: int, revenue: float):
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        statement = upsert(cls).values(seller_id=seller_id, status=status, count=count, revenue=round(revenue, MONEY_DIGITS))
+        db.exec(statement.on_conflict_do_update(
+            index_elements=[cls.seller_id, cls.status],
+            set_={"count": cls.count + statement.excluded.count, "revenue": func.round(cast(cls.revenue + statement.excluded.revenue, Numeric), MONEY_DIGITS)}
+        ))
+
+    @classmethod
+    def move(cls, db: Session, seller_id: int, from_status: OrderStatus, to_status: OrderStatus, revenue: float, count: int = 1):
+        cls.record(db, seller_id, from_status, -count, -revenue)
+        cls.record(db, seller_id, to_status, count, revenue)
 
+    @classmethod
+    def current(cls, db: Session, seller_id: Optional[int] = None) -> dict:
+        statement = select(cls)
+        if seller_id is not None:
+            statement = statement.where(cls.seller_id == seller_id)
+        stats = {(stat.seller_id, stat.status): (stat.count, stat.revenue) for stat in db.exec(statement).all()}
+        for pending_seller_id, orders, revenue in ProductStockShard.pending_stats(db, seller_id):
+            count, total = stats.get((pending_seller_id, OrderStatus.created), (0, 0.0))
+            stats[(pending_seller_id, OrderStatus.created)] = (count + orders, round(total + revenue, MONEY_DIGITS))
+        return stats
+
+    @classmethod
+    def for_seller(cls, db: Session, seller_id: int) -> dict:
+        return {status: stat for (_, status), stat in cls.current(db, seller_id).items()}
+
+    @classmethod
+    def expected(cls, seller_id: Optional[int] = None):
+        sources = [select(table.seller_id, table.status, table.total_price) for table in (Order, OrderArchive)]
+        if seller_id is not None:
+            sources = [source.where(table.seller_id == seller_id) for source, table in zip(sources, (Order, OrderArchive))]
+        orders = union_all(*sources).subquery()
+        return select(
+            orders.c.seller_id, orders.c.status, func.count(), func.coalesce(func.sum(orders.c.total_price), 0.0)
+        ).group_by(orders.c.seller_id, orders.c.status)
+
+    @classmethod
+    def verify(cls, db: Session, seller_id: Optional[int] = None) -> List[dict]:
+        expected = {(row[0], row[1]): (row[2], row[3]) for row in db.exec(cls.expected(seller_id)).all()}
+        actual = cls.current(db, seller_id)
+        drift = []
+        for key in sorted(set(expected) | set(actual), key=lambda key: (key[0], key[1].value)):
+            want = expected.get(key, (0, 0.0))
+            have = actual.get(key, (0, 0.0))
+            if want[0] != have[0] or abs(want[1] - have[1]) > 1e-6:
+                drift.append({
+                    "seller_id": key[0], "status": key[1].value,
+                    "expected_count": want[0], "count": have[0],
+                    "expected_revenue": want[1], "revenue": have[1],
+                })
+        return drift
+
+    @classmethod
+    def rebuild(cls, db: Session, seller_id: Optional[int] = None) -> int:
+        statement = delete(cls)
+        pending = update(ProductStockShard).where(ProductStockShard.orders != 0)
+        if seller_id is not None:
+            statement = statement.where(cls.seller_id == seller_id)
+            pending = pending.where(ProductStockShard.product_id.in_(select(Product.id).where(Product.seller_id == seller_id)))
+        db.exec(statement)
+        db.exec(pending.values(orders=0, revenue=0.0).execution_options(synchronize_session=False))
+        rows = db.exec(cls.expected(seller_id)).all()
+        if rows:
+            db.exec(insert(cls), params=[
+                {"seller_id": row[0], "status": row[1], "count": row[2], "revenue": row[3]} for row in rows
+            ])
+        db.commit()
+        return len(rows)
+
+class IdempotencyKey(SQLModel, table=True):
+    user_id: int = Field(primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+    fingerprint: str = Field(max_length=64)
+    status: Optional[int] = None
+    content_type: Optional[str] = Field(default=None, max_length=128)
+    body: Optional[bytes] = None
+    created_at: datetime = Field(default_factory=utcnow, index=True, nullable=False)
+
+    @classmethod
+    def claim(cls, db: Session, user_id: int, key: str, fingerprint: str, lease_cutoff: datetime) -> Optional["IdempotencyKey"]:
+        try:
+            db.exec(insert(cls).values(user_id=user_id, key=key, fingerprint=fingerprint, created_at=utcnow()))
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+        expired = db.exec(
+            update(cls)
+            .where(cls.user_id == user_id, cls.key == key, cls.status.is_(None), cls.created_at < lease_cutoff)
+            .values(fingerprint=fingerprint, created_at=utcnow())
+        )
+        db.commit()
+        if expired.rowcount == 1:
+            return None
+        return db.get(cls, (user_id, key))
+
+    @classmethod
+    def complete(cls, db: Session, user_id: int, key: str, status: int, content_type: Optional[str], body: bytes):
+        db.exec(
+            update(cls)
+            .where(cls.user_id == user_id, cls.key == key)
+            .values(status=status, content_type=content_type, body=body)
+        )
+        db.commit()
+
+    @classmethod
+    def release(cls, db: Session, user_id: int, key: str):
+        db.exec(delete(cls).where(cls.user_id == user_id, cls.key == key, cls.status.is_(None)))
+        db.commit()
+
+    @classmethod
+    def purge(cls, db: Session, cutoff: datetime) -> int:
+        result = db.exec(delete(cls).where(cls.created_at < cutoff))
+        db.commit()
+        return result.rowcount
@@ -0,0 +1,232 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import orjson
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+event_buffer_size = int(os.getenv("EVENT_BUFFER_SIZE", "10000"))
+event_queue_size = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+event_heartbeat = float(os.getenv("EVENT_HEARTBEAT", "15"))
+logger = logging.getLogger("events")
+
+
+def event_key(event_id: str) -> Tuple[int, ...]:
+    try:
+        return tuple(int(part) for part in event_id.split("-"))
+    except (AttributeError, ValueError):
+        return ()
+
+
+class Subscription:
+    def __init__(self, hub: "EventHub", user_id: int, last_event_id: Optional[str]):
+        self.hub = hub
+        self.user_id = user_id
+        self.last = hub.backend.resume_key(event_key(last_event_id)) if last_event_id else None
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=event_queue_size)
+        self.lagged = False
+
+    def offer(self, event: dict):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: dict):
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        while True:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+            if event is None:
+                raise ConnectionResetError("Subscriber fell behind, reconnect with Last-Event-ID.")
+            key = event_key(event["id"])
+            if self.last is None or key > self.last:
+                self.last = key
+                return event
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    def __init__(self, buffer_size: int):
+        self.buffer = deque(maxlen=buffer_size)
+        self.subscribers: Dict[int, Set[Subscription]] = {}
+        self.lock = threading.Lock()
+        self.backend = None
+
+    def dispatch(self, event: dict):
+        with self.lock:
+            self.buffer.append(event)
+            targets = [
+                subscription
+                for user_id in {event["buyer_id"], event["seller_id"]}
+                for subscription in self.subscribers.get(user_id, ())
+            ]
+        for subscription in targets:
+            subscription.offer(event)
+
+    def publish(self, events: List[dict]):
+        self.backend.publish(events)
+
+    def subscribe(self, user_id: int, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(self, user_id, last_event_id)
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(subscription)
+            missed = [
+                event for event in self.buffer
+                if user_id in (event["buyer_id"], event["seller_id"]) and event_key(event["id"]) > subscription.last
+            ] if last_event_id else []
+        for event in missed:
+            subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.user_id]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"buffered": len(self.buffer), "subscribers": sum(len(items) for items in self.subscribers.values())}
+
+
+class MemoryBackend:
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+        self.epoch = time.time_ns()
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def publish(self, events: List[dict]):
+        with self.lock:
+            for event in events:
+                self.hub.dispatch({**event, "id": f"{self.epoch}-{next(self.counter)}"})
+
+    def resume_key(self, key: Tuple[int, ...]) -> Tuple[int, ...]:
+        return key if key[:1] == (self.epoch,) else ()
+
+class RedisBackend:
+    def __init__(self, hub: EventHub, url: str, stream: str = "order_events"):
+        import redis
+        self.hub = hub
+        self.client = redis.Redis.from_url(url)
+        self.stream = stream
+        threading.Thread(target=self.listen, daemon=True).start()
+
+    def publish(self, events: List[dict]):
+        pipeline = self.client.pipeline(transaction=False)
+        for event in events:
+            pipeline.xadd(self.stream, {"data": orjson.dumps(event)}, maxlen=event_buffer_size, approximate=True)
+        pipeline.execute()
+
+    def resume_key(self, key: Tuple[int, ...]) -> Tuple[int, ...]:
+        return key
+
+    def listen(self):
+        last_id = "0-0"
+        while True:
+            try:
+                for _, entries in self.client.xread({self.stream: last_id}, block=5000) or []:
+                    for entry_id, fields in entries:
+                        last_id = entry_id.decode()
+                        self.hub.dispatch({**orjson.loads(fields[b"data"]), "id": last_id})
+            except Exception:
+                threading.Event().wait(1)
+
+def make_hub(url: str) -> EventHub:
+    hub = EventHub(event_buffer_size)
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        hub.backend = RedisBackend(hub, url)
+    else:
+        hub.backend = MemoryBackend(hub)
+    return hub
+
+hub = make_hub(os.getenv("EVENTS_URL", "memory://"))
+
+
+def order_event(order_id: int, status, buyer_id: int, seller_id: int, previous_status=None) -> dict:
+    return {
+        "type": "order.status",
+        "order_id": order_id,
+        "status": getattr(status, "value", status),
+        "previous_status": getattr(previous_status, "value", previous_status),
+        "buyer_id": buyer_id,
+        "seller_id": seller_id,
+    }
+
+def publish_after_commit(db: OrmSession, *events: dict):
+    db.info.setdefault("pending_events", []).extend(events)
+
+def format_sse(event: dict) -> bytes:
+    return b"id: " + event["id"].encode() + b"\nevent: " + event["type"].encode() + b"\ndata: " + orjson.dumps(event) + b"\n\n"
+
+async def stream_events(user_id: int, last_event_id: Optional[str]) -> AsyncIterator[bytes]:
+    subscription = hub.subscribe(user_id, last_event_id)
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                event = await subscription.next(event_heartbeat)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            except ConnectionResetError:
+                return
+            yield format_sse(event)
+    finally:
+        subscription.close()
+
+def events_response(user_id: int, last_event_id: Optional[str]) -> StreamingResponse:
+    return StreamingResponse(
+        stream_events(user_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def websocket_events(websocket: WebSocket, user_id: int, last_event_id: Optional[str]):
+    await websocket.accept()
+    subscription = hub.subscribe(user_id, last_event_id)
+    try:
+        while True:
+            try:
+                event = await subscription.next(event_heartbeat)
+            except asyncio.TimeoutError:
+                await websocket.send_text('{"type":"ping"}')
+                continue
+            await websocket.send_text(orjson.dumps(event).decode())
+    except ConnectionResetError:
+        await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
+
+@event.listens_for(OrmSession, "after_commit")
+def publish_pending_events(db: OrmSession):
+    events = db.info.pop("pending_events", None)
+    if events:
+        try:
+            hub.publish(events)
+        except Exception:
+            logger.exception("Could not publish %s committed events", len(events))
+
+@event.listens_for(OrmSession, "after_rollback")
+def discard_pending_events(db: OrmSession):
+    db.info.pop("pending_events", None)
@@ -0,0 +1,49 @@
+import csv
+import io
+import os
+from enum import Enum
+from typing import Iterator
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from database.db import get_read_engine
+from schems.posts import ExportFormat
+
+export_batch_size = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+media_types = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _plain(value):
+    return value.value if isinstance(value, Enum) else value
+
+def iter_export(statement, fmt: ExportFormat) -> Iterator[bytes]:
+    with Session(get_read_engine()) as db:
+        result = db.execute(statement.execution_options(yield_per=export_batch_size))
+        columns = list(result.keys())
+        if fmt == ExportFormat.csv:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue().encode("utf-8")
+            for rows in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_plain(value) for value in row] for row in rows)
+                yield buffer.getvalue().encode("utf-8")
+        else:
+            for rows in result.partitions():
+                yield b"".join(
+                    orjson.dumps({column: _plain(value) for column, value in zip(columns, row)}) + b"\n"
+                    for row in rows
+                )
+
+def export_response(statement, fmt: ExportFormat, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_export(statement, fmt),
+        media_type=media_types[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt.value}"'},
+    )
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import re
+from datetime import timedelta
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from sqlmodel import Session
+from cache import TTLCache
+from database.db import get_engine
+from database.models import IdempotencyKey, utcnow
+from utils import token_user_id
+
+idempotency_ttl = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+idempotency_max_body = int(os.getenv("IDEMPOTENCY_MAX_BODY", str(1024 * 1024)))
+idempotency_purge_interval = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+idempotency_lease = float(os.getenv("IDEMPOTENCY_LEASE", "60"))
+responses = TTLCache(
+    "idempotency",
+    int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+    idempotency_ttl,
+    maxbytes=int(os.getenv("IDEMPOTENCY_CACHE_BYTES", str(16 * 1024 * 1024))),
+    weigh=lambda stored: len(stored[3]) + 256,
+)
+
+idempotent_paths = re.compile(r"/buyer/(create_order|add_cart_items|checkout|add_balance/[^/]+)")
+retryable_statuses = {408, 409, 425, 429}
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}?".encode())
+    digest.update(query)
+    digest.update(b"\n")
+    digest.update(body)
+    return digest.hexdigest()
+
+def _claim(user_id: int, key: str, request_fingerprint: str):
+    with Session(get_engine()) as db:
+        return IdempotencyKey.claim(db, user_id, key, request_fingerprint, utcnow() - timedelta(seconds=idempotency_lease))
+
+def _complete(user_id: int, key: str, stored: tuple):
+    with Session(get_engine()) as db:
+        IdempotencyKey.complete(db, user_id, key, stored[1], stored[2], stored[3])
+
+def _release(user_id: int, key: str):
+    with Session(get_engine()) as db:
+        IdempotencyKey.release(db, user_id, key)
+
+def purge_expired_keys() -> int:
+    with Session(get_engine()) as db:
+        return IdempotencyKey.purge(db, utcnow() - timedelta(seconds=idempotency_ttl))
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not idempotent_paths.fullmatch(scope["path"]):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        key = headers.get(b"idempotency-key", b"").decode("latin-1").strip()
+        if not key:
+            return await self.app(scope, receive, send)
+        if len(key) > 255:
+            return await JSONResponse({"detail": "Idempotency-Key is too long."}, status_code=400)(scope, receive, send)
+        try:
+            user_id = token_user_id(headers.get(b"token", b"").decode("latin-1"))
+        except HTTPException:
+            return await self.app(scope, receive, send)
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) > idempotency_max_body:
+                return await JSONResponse({"detail": "Request body is too large for an Idempotency-Key."}, status_code=413)(scope, receive, send)
+        request_fingerprint = fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+
+        stored = responses.get((user_id, key))
+        if stored is None:
+            existing = await run_in_threadpool(_claim, user_id, key, request_fingerprint)
+            if existing is not None:
+                if existing.status is None:
+                    return await self.reject(scope, receive, send, 409, "A request with this Idempotency-Key is still in progress.")
+                stored = (existing.fingerprint, existing.status, existing.content_type, existing.body or b"")
+                responses.set((user_id, key), stored)
+        if stored is not None:
+            if stored[0] != request_fingerprint:
+                return await self.reject(scope, receive, send, 422, "Idempotency-Key was already used with a different request.")
+            return await self.replay(send, stored)
+
+        async def receive_body():
+            nonlocal body
+            if body is None:
+                return await receive()
+            message, body = {"type": "http.request", "body": body, "more_body": False}, None
+            return message
+
+        response = {"status": 500, "content_type": None, "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        except Exception:
+            await run_in_threadpool(_release, user_id, key)
+            raise
+        if response["status"] >= 500 or response["status"] in retryable_statuses:
+            await run_in_threadpool(_release, user_id, key)
+            return
+        stored = (request_fingerprint, response["status"], response["content_type"], b"".join(response["body"]))
+        responses.set((user_id, key), stored)
+        await run_in_threadpool(_complete, user_id, key, stored)
+
+    async def reject(self, scope, receive, send, status: int, detail: str):
+        await JSONResponse({"detail": detail}, status_code=status)(scope, receive, send)
+
+    async def replay(self, send, stored: tuple):
+        headers = [(b"idempotent-replayed", b"true"), (b"content-length", str(len(stored[3])).encode())]
+        if stored[2]:
+            headers.append((b"content-type", stored[2].encode("latin-1")))
+        await send({"type": "http.response.start", "status": stored[1], "headers": headers})
+        await send({"type": "http.response.body", "body": stored[3]})
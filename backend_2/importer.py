@@ -0,0 +1,103 @@
+import csv
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+import orjson
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from sqlmodel import Session
+from schems.posts import CreateProduct, ExportFormat, ImportResult, ImportRowError
+
+import_batch_size = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+import_max_errors = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pending = b""
+    first = True
+    async for chunk in chunks:
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if first:
+                line, first = line.removeprefix(b"\xef\xbb\xbf"), False
+            yield line.decode("utf-8", errors="replace") + "\n"
+    if pending:
+        yield pending.removeprefix(b"\xef\xbb\xbf" if first else b"").decode("utf-8", errors="replace")
+
+async def iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    header = None
+    record = ""
+    number = 0
+    async for line in lines:
+        record += line
+        if record.count('"') % 2:
+            continue
+        if not record.strip():
+            record = ""
+            continue
+        values = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            continue
+        number += 1
+        if len(values) != len(header):
+            yield number, None, f"Expected {len(header)} columns, got {len(values)}."
+        else:
+            yield number, {key: value if value != "" else None for key, value in zip(header, values)}, None
+    if record.strip():
+        yield number + 1, None, "Unterminated quoted field."
+
+async def iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            value = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield number, None, "Invalid JSON."
+            continue
+        if isinstance(value, dict):
+            yield number, value, None
+        else:
+            yield number, None, "Expected a JSON object."
+
+def validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+async def import_products(chunks: AsyncIterator[bytes], fmt: ExportFormat, seller, db: Session) -> ImportResult:
+    records = (iter_csv if fmt == ExportFormat.csv else iter_ndjson)(iter_lines(chunks))
+    result = ImportResult(imported=0, failed=0, errors=[])
+
+    def fail(number: int, detail: str):
+        result.failed += 1
+        if len(result.errors) < import_max_errors:
+            result.errors.append(ImportRowError(row=number, detail=detail))
+
+    async def flush(batch: List[Tuple[int, CreateProduct]]):
+        try:
+            await run_in_threadpool(seller.add_products, db, [product for _, product in batch])
+            result.imported += len(batch)
+        except Exception as exc:
+            for number, _ in batch:
+                fail(number, f"Batch insert failed: {exc.__class__.__name__}.")
+
+    batch = []
+    async for number, record, error in records:
+        if error:
+            fail(number, error)
+            continue
+        try:
+            batch.append((number, CreateProduct.model_validate(record)))
+        except ValidationError as exc:
+            fail(number, validation_detail(exc))
+        if len(batch) >= import_batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    result.errors_truncated = result.failed > len(result.errors)
+    return result
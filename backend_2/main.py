@@ -1,20 +1,76 @@
-from fastapi import FastAPI
-from database.db import create_db_and_tables
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter
+from database.db import configure_engines, create_db_and_tables, dispose_engines, get_engine
+from settings import Settings
+from utils import get_hash_pool, shutdown_hash_pool
+from metrics import MetricsMiddleware, ORJSONResponse, metrics_endpoint
+from scheduler import run_scheduler
+from idempotency import IdempotencyMiddleware
+from admission import AdmissionMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from routes.base import app as base_router
 from routes.buyer import app as buyer_router
 from routes.seller import app as seller_router
 
-create_db_and_tables()
-app = FastAPI()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-app.include_router(buyer_router, prefix="/buyer", tags=["buyer"])
-app.include_router(base_router, prefix="/base", tags=["base"])
-app.include_router(seller_router, prefix="/seller", tags=["seller"])
+def merge_routers(primary: APIRouter, fallback: APIRouter) -> APIRouter:
+    router = APIRouter()
+    methods = lambda route: getattr(route, "methods", None) or {"WEBSOCKET"}
+    covered = {(route.path, method) for route in primary.routes for method in methods(route)}
+    router.routes.extend(primary.routes)
+    router.routes.extend(
+        route for route in fallback.routes
+        if any((route.path, method) not in covered for method in methods(route))
+    )
+    return router
+
+def create_app(settings: Settings = None) -> FastAPI:
+    settings = settings or Settings()
+    configure_engines(settings)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        get_engine()
+        if settings.db_create_tables:
+            create_db_and_tables()
+        get_hash_pool()
+        stop = asyncio.Event()
+        scheduler = asyncio.create_task(run_scheduler(stop)) if settings.scheduler_enabled else None
+        yield
+        stop.set()
+        if scheduler:
+            await scheduler
+        shutdown_hash_pool()
+        await dispose_engines()
+
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+    app.state.settings = settings
+
+    app.add_middleware(IdempotencyMiddleware)
+    if settings.admission_enabled:
+        app.add_middleware(AdmissionMiddleware)
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+        app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    buyer, base, seller = buyer_router, base_router, seller_router
+    if settings.async_db:
+        from routes.async_base import app as async_base_router
+        from routes.async_buyer import app as async_buyer_router
+        from routes.async_seller import app as async_seller_router
+        buyer = merge_routers(async_buyer_router, buyer)
+        base = merge_routers(async_base_router, base)
+        seller = merge_routers(async_seller_router, seller)
+    app.include_router(buyer, prefix="/buyer", tags=["buyer"])
+    app.include_router(base, prefix="/base", tags=["base"])
+    app.include_router(seller, prefix="/seller", tags=["seller"])
+    return app
+
+app = create_app()
@@ -0,0 +1,131 @@
+import argparse
+import json
+import logging
+import os
+from sqlmodel import Session
+from database.db import create_db_and_tables, get_engine
+from database.models import Product, SellerStat
+from scheduler import archive_orders, expire_stale_orders, flush_flash_sales, run_worker
+
+
+def stats_verify(args):
+    with Session(get_engine()) as db:
+        drift = SellerStat.verify(db, args.seller_id)
+    print(json.dumps({"drift": drift}, indent=2))
+    return 1 if drift else 0
+
+def stats_rebuild(args):
+    with Session(get_engine()) as db:
+        rows = SellerStat.rebuild(db, args.seller_id)
+    print(json.dumps({"rebuilt_rows": rows}))
+    return 0
+
+def orders_expire(args):
+    print(json.dumps({"expired": expire_stale_orders(args.older_than)}))
+    return 0
+
+def orders_archive(args):
+    print(json.dumps({"archived": archive_orders(args.older_than_days, args.max_batches)}))
+    return 0
+
+def flash_sale_start(args):
+    with Session(get_engine()) as db:
+        product = db.get(Product, args.product_id)
+        if product is None:
+            print(json.dumps({"error": "Product not found."}))
+            return 1
+        product.start_flash_sale(db, args.shards)
+    print(json.dumps({"product_id": args.product_id, "shards": args.shards}))
+    return 0
+
+def flash_sale_end(args):
+    with Session(get_engine()) as db:
+        product = db.get(Product, args.product_id)
+        if product is None:
+            print(json.dumps({"error": "Product not found."}))
+            return 1
+        product.end_flash_sale(db)
+        print(json.dumps({"product_id": product.id, "stock": product.stock, "reserved": product.reserved}))
+    return 0
+
+def flash_sale_flush(args):
+    print(json.dumps({"flushed": flush_flash_sales()}))
+    return 0
+
+def idempotency_purge(args):
+    from idempotency import purge_expired_keys
+    print(json.dumps({"purged": purge_expired_keys()}))
+    return 0
+
+def migrate(args):
+    from alembic import command
+    from alembic.config import Config
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    if args.stamp:
+        command.stamp(config, args.revision)
+    else:
+        command.upgrade(config, args.revision)
+    return 0
+
+def create_tables(args):
+    create_db_and_tables()
+    return 0
+
+def worker(args):
+    logging.basicConfig(level=logging.INFO)
+    run_worker()
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats = commands.add_parser("stats", help="Per-seller order aggregates.")
+    stats_commands = stats.add_subparsers(dest="action", required=True)
+    for name, handler, help_text in [
+        ("verify", stats_verify, "Compare the aggregates with the Order table and report drift."),
+        ("rebuild", stats_rebuild, "Recompute the aggregates from the Order table."),
+    ]:
+        command = stats_commands.add_parser(name, help=help_text)
+        command.add_argument("--seller-id", type=int)
+        command.set_defaults(handler=handler)
+
+    orders = commands.add_parser("orders", help="Order maintenance.")
+    orders_commands = orders.add_subparsers(dest="action", required=True)
+    expire = orders_commands.add_parser("expire", help="Cancel created or acknowledged orders older than the TTL.")
+    expire.add_argument("--older-than", type=float, help="Age in seconds, defaults to ORDER_TTL.")
+    expire.set_defaults(handler=orders_expire)
+    archive = orders_commands.add_parser("archive", help="Move confirmed or cancelled orders into the archive table.")
+    archive.add_argument("--older-than-days", type=float, help="Defaults to ARCHIVE_AFTER_DAYS.")
+    archive.add_argument("--max-batches", type=int)
+    archive.set_defaults(handler=orders_archive)
+
+    flash_sale = commands.add_parser("flash-sale", help="Sharded stock reservation for hot products.")
+    flash_sale_commands = flash_sale.add_subparsers(dest="action", required=True)
+    start = flash_sale_commands.add_parser("start", help="Split the product stock into shards.")
+    start.add_argument("--product-id", type=int, required=True)
+    start.add_argument("--shards", type=int, default=16)
+    start.set_defaults(handler=flash_sale_start)
+    end = flash_sale_commands.add_parser("end", help="Fold the shards back into the product row.")
+    end.add_argument("--product-id", type=int, required=True)
+    end.set_defaults(handler=flash_sale_end)
+    flash_sale_commands.add_parser("flush", help="Move shard reservations into the product rows.").set_defaults(handler=flash_sale_flush)
+
+    idempotency = commands.add_parser("idempotency", help="Idempotency key maintenance.")
+    idempotency_commands = idempotency.add_subparsers(dest="action", required=True)
+    idempotency_commands.add_parser("purge", help="Delete keys older than IDEMPOTENCY_TTL.").set_defaults(handler=idempotency_purge)
+
+    migrate_command = commands.add_parser("migrate", help="Apply the Alembic migrations.")
+    migrate_command.add_argument("--revision", default="head")
+    migrate_command.add_argument("--stamp", action="store_true", help="Mark the database as migrated without running the migrations. Databases created by the original create_all are at --revision 0001.")
+    migrate_command.set_defaults(handler=migrate)
+    commands.add_parser("create-tables", help="Create missing tables from the models, for local development.").set_defaults(handler=create_tables)
+
+    commands.add_parser("worker", help="Run the background jobs in this process.").set_defaults(handler=worker)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
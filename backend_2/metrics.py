@@ -0,0 +1,202 @@
+import asyncio
+import bisect
+import functools
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import responses
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.responses import PlainTextResponse
+from database.db import QueryStats, query_stats
+from cache import cache_stats
+from admission import admission_stats
+
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "count", "duration", "queries", "sql_time", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(latency_buckets) + 1)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statuses = defaultdict(int)
+
+    def observe(self, status: int, duration: float, stats: QueryStats):
+        self.buckets[bisect.bisect_left(latency_buckets, duration)] += 1
+        self.count += 1
+        self.duration += duration
+        self.queries += stats.queries
+        self.sql_time += stats.sql_time
+        self.statuses[status] += 1
+
+routes = defaultdict(RouteMetrics)
+
+
+class RequestTimings:
+    __slots__ = ("stats", "validation", "serialization", "mark")
+
+    def __init__(self, stats: QueryStats):
+        self.stats = stats
+        self.validation = 0.0
+        self.serialization = 0.0
+        self.mark = 0.0
+
+    def lap(self) -> float:
+        now = time.perf_counter() - self.stats.sql_time
+        elapsed, self.mark = now - self.mark, now
+        return elapsed
+
+    def add_serialization(self, seconds: float):
+        self.serialization += seconds
+        self.mark += seconds
+
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def timed_endpoint(call):
+    def started():
+        timings = request_timings.get()
+        if timings is not None:
+            timings.validation += timings.lap()
+
+    def finished():
+        timings = request_timings.get()
+        if timings is not None:
+            timings.lap()
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(**values):
+            started()
+            try:
+                return await call(**values)
+            finally:
+                finished()
+    else:
+        @functools.wraps(call)
+        def endpoint(**values):
+            started()
+            try:
+                return call(**values)
+            finally:
+                finished()
+    return endpoint
+
+class TimedRoute(APIRoute):
+    """Splits the time outside the endpoint into request validation and response serialization."""
+
+    def get_route_handler(self):
+        self.dependant.call = timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timings = request_timings.get()
+            if timings is None:
+                return await handler(request)
+            timings.lap()
+            response = await handler(request)
+            timings.add_serialization(timings.lap())
+            return response
+        return timed_handler
+
+class ORJSONResponse(responses.ORJSONResponse):
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            timings = request_timings.get()
+            if timings is not None:
+                timings.add_serialization(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = QueryStats()
+        timings = RequestTimings(stats)
+        token = query_stats.set(stats)
+        timings_token = request_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total = (time.perf_counter() - started) * 1000
+                sql = stats.sql_time * 1000
+                validation = timings.validation * 1000
+                serialization = timings.serialization * 1000
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    f'db;dur={sql:.2f};desc="{stats.queries} queries", validate;dur={validation:.2f}, '
+                    f'serialize;dur={serialization:.2f}, app;dur={total - sql - validation - serialization:.2f}, total;dur={total:.2f}'
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(timings_token)
+            query_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            routes[(scope["method"], path)].observe(status, time.perf_counter() - started, stats)
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+def _histogram(labels: dict, metrics: RouteMetrics) -> list:
+    lines, cumulative = [], 0
+    for bound, count in zip(latency_buckets + (float("inf"),), metrics.buckets):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"http_request_duration_seconds_bucket{_labels(**labels, le=le)} {cumulative}")
+    lines.append(f"http_request_duration_seconds_sum{_labels(**labels)} {metrics.duration:.6f}")
+    lines.append(f"http_request_duration_seconds_count{_labels(**labels)} {metrics.count}")
+    return lines
+
+def render_metrics() -> str:
+    by_route = [({"method": method, "route": path}, metrics) for (method, path), metrics in sorted(routes.items())]
+    caches = sorted(cache_stats().items())
+    families = [
+        ("http_request_duration_seconds", "histogram", [
+            line for labels, metrics in by_route for line in _histogram(labels, metrics)
+        ]),
+        ("http_requests_total", "counter", [
+            f"http_requests_total{_labels(**labels, status=status)} {count}"
+            for labels, metrics in by_route for status, count in sorted(metrics.statuses.items())
+        ]),
+        ("db_queries_total", "counter", [
+            f"db_queries_total{_labels(**labels)} {metrics.queries}" for labels, metrics in by_route
+        ]),
+        ("db_query_duration_seconds_total", "counter", [
+            f"db_query_duration_seconds_total{_labels(**labels)} {metrics.sql_time:.6f}" for labels, metrics in by_route
+        ]),
+        ("cache_hits_total", "counter", [f"cache_hits_total{_labels(cache=name)} {stats['hits']}" for name, stats in caches]),
+        ("cache_misses_total", "counter", [f"cache_misses_total{_labels(cache=name)} {stats['misses']}" for name, stats in caches]),
+        ("admission_in_flight", "gauge", [f"admission_in_flight {admission_stats['in_flight']}"]),
+        ("admission_rejected_total", "counter", [
+            f"admission_rejected_total{_labels(reason=reason)} {admission_stats[reason]}" for reason in ("rate_limited", "shed")
+        ]),
+    ]
+    lines = []
+    for name, kind, samples in families:
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+def metrics_endpoint(request):
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
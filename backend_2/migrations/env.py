@@ -0,0 +1,49 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlmodel import SQLModel
+from database.db import make_engine
+from settings import Settings
+import database.models
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = SQLModel.metadata
+url = config.get_main_option("sqlalchemy.url") or Settings().db_path
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and (name.startswith("product_fts") or name in ("search", "ix_product_search")))
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=url.startswith("sqlite"),
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    connectable = make_engine(url)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+    connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
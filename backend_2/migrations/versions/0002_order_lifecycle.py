@@ -0,0 +1,162 @@
+"""order lifecycle, flash sales, seller stats, archive, idempotency and search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 23:12:40.318275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+order_status = postgresql.ENUM('created', 'acknowledged', 'shipped', 'received', 'confirmed', 'cancelled', name='orderstatus', create_type=False)
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE product_fts USING fts5(name, description, content='product', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "INSERT INTO product_fts(product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "INSERT INTO product_fts(product_fts) VALUES ('rebuild')",
+    """CREATE TRIGGER product_fts_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER product_fts_delete AFTER DELETE ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    """CREATE TRIGGER product_fts_update AFTER UPDATE OF name, description ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+POSTGRES_SEARCH_DDL = [
+    """ALTER TABLE product ADD COLUMN search tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') || setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX ix_product_search ON product USING GIN (search)",
+]
+
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    recreate = "always" if bind.dialect.name == "sqlite" else "auto"
+    op.create_table('idempotencykey',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('fingerprint', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('status', sa.Integer(), nullable=True),
+    sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(length=128), nullable=True),
+    sa.Column('body', sa.LargeBinary(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+    with op.batch_alter_table('idempotencykey', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_idempotencykey_created_at'), ['created_at'], unique=False)
+
+    op.create_table('orderarchive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('buyer_id', sa.Integer(), nullable=False),
+    sa.Column('seller_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.Column('status', order_status, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('orderarchive', schema=None) as batch_op:
+        batch_op.create_index('ix_orderarchive_buyer_id_id', ['buyer_id', 'id'], unique=False)
+        batch_op.create_index('ix_orderarchive_seller_id_id', ['seller_id', 'id'], unique=False)
+
+    op.create_table('sellerstat',
+    sa.Column('seller_id', sa.Integer(), nullable=False),
+    sa.Column('status', order_status, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['seller_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('seller_id', 'status')
+    )
+    op.execute(
+        'INSERT INTO sellerstat (seller_id, status, count, revenue) '
+        'SELECT seller_id, status, count(*), sum(total_price) FROM "order" GROUP BY seller_id, status'
+    )
+    op.create_table('productstockshard',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('reserved', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'shard')
+    )
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('flash_sale', sa.Boolean(), server_default=sa.false(), nullable=False))
+        batch_op.create_index('ix_product_in_stock_id', ['id'], unique=False, sqlite_where=sa.text('stock > 0'), postgresql_where=sa.text('stock > 0'))
+        batch_op.create_index('ix_product_in_stock_price_id', ['price', 'id'], unique=False, sqlite_where=sa.text('stock > 0'), postgresql_where=sa.text('stock > 0'))
+        batch_op.create_index('ix_product_price_id', ['price', 'id'], unique=False)
+        batch_op.create_index('ix_product_seller_id_id', ['seller_id', 'id'], unique=False)
+        batch_op.create_index('ix_product_seller_id_price_id', ['seller_id', 'price', 'id'], unique=False)
+
+    with op.batch_alter_table('order', schema=None, recreate=recreate, table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False))
+        batch_op.create_index('ix_order_status_created_at', ['status', 'created_at'], unique=False)
+        batch_op.create_index('ix_order_status_updated_at', ['status', 'updated_at'], unique=False)
+
+    if bind.dialect.name == "sqlite":
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+    elif bind.dialect.name == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in ("product_fts_insert", "product_fts_delete", "product_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS product_fts")
+    elif bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_product_search")
+        op.execute("ALTER TABLE product DROP COLUMN IF EXISTS search")
+    recreate = "always" if bind.dialect.name == "sqlite" else "auto"
+    with op.batch_alter_table('order', schema=None, recreate=recreate, table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        batch_op.drop_index('ix_order_status_updated_at')
+        batch_op.drop_index('ix_order_status_created_at')
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_seller_id_price_id')
+        batch_op.drop_index('ix_product_seller_id_id')
+        batch_op.drop_index('ix_product_price_id')
+        batch_op.drop_index('ix_product_in_stock_price_id', sqlite_where=sa.text('stock > 0'), postgresql_where=sa.text('stock > 0'))
+        batch_op.drop_index('ix_product_in_stock_id', sqlite_where=sa.text('stock > 0'), postgresql_where=sa.text('stock > 0'))
+        batch_op.drop_column('flash_sale')
+
+    op.drop_table('productstockshard')
+    op.drop_table('sellerstat')
+    with op.batch_alter_table('orderarchive', schema=None) as batch_op:
+        batch_op.drop_index('ix_orderarchive_seller_id_id')
+        batch_op.drop_index('ix_orderarchive_buyer_id_id')
+
+    op.drop_table('orderarchive')
+    with op.batch_alter_table('idempotencykey', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_idempotencykey_created_at'))
+
+    op.drop_table('idempotencykey')
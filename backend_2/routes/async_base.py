@@ -0,0 +1,41 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from schems.posts import ProductInfo, UserInfo, CatalogQuery, ProductPage, SearchQuery, ProductSearchPage
+from database.db import get_async_session, get_async_read_session
+from database.models import User, Product
+from utils import aget_curent_user
+from cache import acached_bytes, catalog_key, product_key
+from metrics import TimedRoute
+
+app = APIRouter(route_class=TimedRoute)
+
+@app.get("/product/{product_id}", response_model=ProductInfo)
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_read_session)):
+    async def load():
+        product = await db.get(Product, product_id)
+        return ProductInfo.model_validate(product, from_attributes=True).model_dump_json().encode() if product else None
+    content = await acached_bytes(product_key(product_id), load)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return Response(content=content, media_type="application/json")
+
+@app.get("/products", response_model=ProductPage)
+async def get_products(query: Annotated[CatalogQuery, Query()], db: AsyncSession = Depends(get_async_read_session)):
+    async def load():
+        products, next_cursor = await Product.aget_page(db, query)
+        return ProductPage(
+            items=[ProductInfo.model_validate(product, from_attributes=True) for product in products],
+            next_cursor=next_cursor
+        ).model_dump_json().encode()
+    return Response(content=await acached_bytes(catalog_key(query), load), media_type="application/json")
+
+@app.get("/products/search", response_model=ProductSearchPage)
+async def search_products(query: Annotated[SearchQuery, Query()], db: AsyncSession = Depends(get_async_read_session)):
+    async def load():
+        return ProductSearchPage(items=await Product.asearch(db, query)).model_dump_json().encode()
+    return Response(content=await acached_bytes(catalog_key(query), load), media_type="application/json")
+
+@app.get("/me", response_model=UserInfo)
+async def get_me(user: User = Depends(aget_curent_user), db: AsyncSession = Depends(get_async_session)):
+    return await db.run_sync(lambda _: UserInfo.model_validate(user, from_attributes=True))
@@ -0,0 +1,68 @@
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from metrics import ORJSONResponse, TimedRoute
+from sqlmodel.ext.asyncio.session import AsyncSession
+from utils import aget_buyer, aget_buyer_snapshot
+from database.db import get_async_session, get_async_read_session
+import serializers
+from schems.posts import CreateCartItem, CartItemsInfo, CreateOrder, OrderFullInfo, Checkout, CheckoutResult, UserSnapshot
+from schems.posts import ArchiveQuery, ArchivedOrderPage
+
+app = APIRouter(route_class=TimedRoute)
+
+@app.post("/add_balance/{amount}")
+async def add_balance(amount: float, buyer=Depends(aget_buyer), db: AsyncSession = Depends(get_async_session)):
+    await buyer.aadd_balance(db, amount)
+    return {"message": "Balance added successfully", "new_balance": buyer.wallet.balance}
+
+@app.post("/add_cart_items")
+async def add_cart_items(cart_item: CreateCartItem, buyer=Depends(aget_buyer), db: AsyncSession = Depends(get_async_session)):
+    await buyer.aadd_cart_item(db, cart_item)
+    return {"message": "Cart item added successfully"}
+
+@app.get("/my_cart_items", response_model=list[CartItemsInfo])
+async def get_cart_items(buyer: UserSnapshot = Depends(aget_buyer_snapshot), db: AsyncSession = Depends(get_async_read_session)):
+    cart_items = await db.run_sync(serializers.buyer_cart_items, buyer.id)
+    if not cart_items:
+        raise HTTPException(status_code=404, detail="No cart items found")
+    return ORJSONResponse(cart_items)
+
+@app.post("/create_order")
+async def create_order(order: CreateOrder, buyer=Depends(aget_buyer), db: AsyncSession = Depends(get_async_session)):
+    await buyer.acreate_order(db, order)
+    return {"message": "Order created successfully"}
+
+@app.post("/checkout", response_model=CheckoutResult)
+async def checkout(checkout: Optional[Checkout] = None, buyer=Depends(aget_buyer), db: AsyncSession = Depends(get_async_session)):
+    return await buyer.acheckout(db, checkout or Checkout())
+
+@app.get("/my_orders", response_model=list[OrderFullInfo])
+async def get_orders(buyer: UserSnapshot = Depends(aget_buyer_snapshot), db: AsyncSession = Depends(get_async_read_session)):
+    orders = await db.run_sync(serializers.buyer_orders, buyer.id)
+    if not orders:
+        raise HTTPException(status_code=404, detail="No orders found")
+    return ORJSONResponse(orders)
+
+@app.post("/my_orders/{order_id}/confirm")
+async def confirm_order(order_id: int, buyer=Depends(aget_buyer), db: AsyncSession = Depends(get_async_session)):
+    await buyer.aorder_confirmed(db, order_id)
+    return {"message": "Order confirmed successfully"}
+
+@app.post("/my_orders/{order_id}/cancel")
+async def cancel_order(order_id: int, buyer=Depends(aget_buyer), db: AsyncSession = Depends(get_async_session)):
+    await buyer.aorder_cancelled(db, order_id)
+    return {"message": "Order cancelled successfully"}
+
+@app.post("/my_orders/{order_id}/received")
+async def received_order(order_id: int, buyer=Depends(aget_buyer), db: AsyncSession = Depends(get_async_session)):
+    await buyer.aorder_received(db, order_id)
+    return {"message": "Order received successfully"}
+
+@app.delete("/my_cart_items/{cart_item_id}")
+async def delete_cart_item(cart_item_id: int, buyer=Depends(aget_buyer), db: AsyncSession = Depends(get_async_session)):
+    await buyer.adelete_cart_item(db, cart_item_id)
+    return {"message": "Cart item deleted successfully"}
+
+@app.get("/my_orders/archive", response_model=ArchivedOrderPage)
+async def get_archived_orders(query: Annotated[ArchiveQuery, Query()], buyer: UserSnapshot = Depends(aget_buyer_snapshot), db: AsyncSession = Depends(get_async_read_session)):
+    return ORJSONResponse(await db.run_sync(serializers.archived_orders, "buyer_id", buyer.id, query))
@@ -0,0 +1,42 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, Query
+from metrics import ORJSONResponse, TimedRoute
+from sqlmodel.ext.asyncio.session import AsyncSession
+from utils import aget_seller, aget_seller_snapshot
+from database.db import get_async_session, get_async_read_session
+import serializers
+from schems.posts import CreateProduct, ProductFullInfo, OrderFullInfo, UserSnapshot, OrderStatus
+from schems.posts import BulkOrderTransition, BulkTransitionResult, ArchiveQuery, ArchivedOrderPage
+
+app = APIRouter(route_class=TimedRoute)
+
+@app.post("/add_product")
+async def add_product(product: CreateProduct, seller=Depends(aget_seller), db: AsyncSession = Depends(get_async_session)):
+    await seller.aadd_product(db, product)
+    return {"message": "Product added successfully"}
+
+@app.get("/my_products", response_model=list[ProductFullInfo])
+async def get_my_products(seller: UserSnapshot = Depends(aget_seller_snapshot), db: AsyncSession = Depends(get_async_read_session)):
+    return ORJSONResponse(await db.run_sync(serializers.seller_products, seller.id))
+
+@app.get("/my_orders", response_model=list[OrderFullInfo])
+async def get_my_orders(seller: UserSnapshot = Depends(aget_seller_snapshot), db: AsyncSession = Depends(get_async_read_session)):
+    return ORJSONResponse(await db.run_sync(serializers.seller_orders, seller.id))
+
+@app.post("/my_orders/bulk/{status}", response_model=BulkTransitionResult)
+async def bulk_transition_orders(status: OrderStatus, orders: BulkOrderTransition, seller=Depends(aget_seller), db: AsyncSession = Depends(get_async_session)):
+    return await seller.abulk_transition_orders(db, orders.order_ids, status)
+
+@app.post("/my_orders/{order_id}/acknowledged")
+async def acknowledge_order(order_id: int, seller=Depends(aget_seller), db: AsyncSession = Depends(get_async_session)):
+    await seller.aorder_acknowledged(db, order_id)
+    return {"message": "Order acknowledged successfully"}
+
+@app.post("/my_orders/{order_id}/shipped")
+async def ship_order(order_id: int, seller=Depends(aget_seller), db: AsyncSession = Depends(get_async_session)):
+    await seller.aorder_shipped(db, order_id)
+    return {"message": "Order shipped successfully"}
+
+@app.get("/my_orders/archive", response_model=ArchivedOrderPage)
+async def get_archived_orders(query: Annotated[ArchiveQuery, Query()], seller: UserSnapshot = Depends(aget_seller_snapshot), db: AsyncSession = Depends(get_async_read_session)):
+    return ORJSONResponse(await db.run_sync(serializers.archived_orders, "seller_id", seller.id, query))
@@ -1,34 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, status
 from fastapi.security import OAuth2PasswordRequestForm
-from schems.posts import CreateUserOpen, AuthUser, Token, ProductInfo, UserInfo
-from database.db import get_session
+from schems.posts import CreateUserOpen, AuthUser, Token, ProductInfo, UserInfo, CatalogQuery, ProductPage, ExportFormat
+from schems.posts import SearchQuery, ProductSearchPage
+from database.db import get_read_session
 from database.models import User, Product
-from sqlmodel import Session, select
-from utils import get_curent_user
+from sqlmodel import Session
+from utils import get_curent_user, token_user_id
+from events import websocket_events
+from export import export_response
+from cache import cache_stats, cached_bytes, catalog_key, product_key
+from metrics import TimedRoute
 
-app = APIRouter()
+app = APIRouter(route_class=TimedRoute)
 
 @app.post("/registration")
-def registration(user: CreateUserOpen, db: Session = Depends(get_session)):
-    User.create_user(db, user)
+async def registration(user: CreateUserOpen):
+    await User.acreate_user(user)
     return {"message": "User created successfully"}
 
 @app.post("/token", response_model=Token)
-def login(auth_user: AuthUser, db: Session = Depends(get_session)):
-    return Token(access_token=User.get_token(db, auth_user))
+async def login(auth_user: AuthUser):
+    return Token(access_token=await User.aget_token(auth_user))
 
 @app.get("/product/{product_id}", response_model=ProductInfo)
-def get_product(product_id: int, db: Session = Depends(get_session)):
-    product = ProductInfo.model_validate(db.get(Product, product_id), from_attributes=True)
-    if not product:
+def get_product(product_id: int, db: Session = Depends(get_read_session)):
+    def load():
+        product = db.get(Product, product_id)
+        return ProductInfo.model_validate(product, from_attributes=True).model_dump_json().encode() if product else None
+    content = cached_bytes(product_key(product_id), load)
+    if content is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return Response(content=content, media_type="application/json")
 
-@app.get("/products", response_model=list[ProductInfo])
-def get_products(db: Session = Depends(get_session)):
-    products = db.exec(select(Product)).all()
-    return [ProductInfo.model_validate(product, from_attributes=True) for product in products]
+@app.get("/products", response_model=ProductPage)
+def get_products(query: Annotated[CatalogQuery, Query()], db: Session = Depends(get_read_session)):
+    def load():
+        products, next_cursor = Product.get_page(db, query)
+        return ProductPage(
+            items=[ProductInfo.model_validate(product, from_attributes=True) for product in products],
+            next_cursor=next_cursor
+        ).model_dump_json().encode()
+    return Response(content=cached_bytes(catalog_key(query), load), media_type="application/json")
+
+@app.get("/products/search", response_model=ProductSearchPage)
+def search_products(query: Annotated[SearchQuery, Query()], db: Session = Depends(get_read_session)):
+    def load():
+        return ProductSearchPage(items=Product.search(db, query)).model_dump_json().encode()
+    return Response(content=cached_bytes(catalog_key(query), load), media_type="application/json")
+
+@app.get("/products/export")
+def export_products(format: ExportFormat = ExportFormat.ndjson):
+    return export_response(Product.export_statement(), format, "products")
 
 @app.get("/me", response_model=UserInfo)
 def get_me(user: User = Depends(get_curent_user)):
     return UserInfo.model_validate(user, from_attributes=True)
+
+@app.websocket("/events/ws")
+async def order_events(websocket: WebSocket, token: str, last_event_id: Optional[str] = None):
+    try:
+        user_id = token_user_id(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket_events(websocket, user_id, last_event_id)
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    return cache_stats()
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
-from utils import get_buyer
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from metrics import ORJSONResponse, TimedRoute
+from utils import get_buyer, get_buyer_snapshot
 from sqlmodel import Session
-from database.db import get_session
-from schems.posts import CreateCartItem, CartItemsInfo, CreateOrder, OrderFullInfo
+from database.db import get_session, get_read_session
+from typing import Annotated, Optional
+from schems.posts import CreateCartItem, CartItemsInfo, CreateOrder, OrderFullInfo, Checkout, CheckoutResult, UserSnapshot
+from schems.posts import ArchiveQuery, ArchivedOrderPage
+import serializers
+from events import events_response
 
-app = APIRouter()
+app = APIRouter(route_class=TimedRoute)
 
 @app.post("/add_balance/{amount}")
 def add_balance(amount: float, buyer=Depends(get_buyer), db: Session = Depends(get_session)):
@@ -17,23 +22,35 @@ def add_cart_items(cart_item: CreateCartItem, buyer=Depends(get_buyer), db: Sess
     return {"message": "Cart item added successfully"}
 
 @app.get("/my_cart_items", response_model=list[CartItemsInfo])
-def get_cart_items(buyer=Depends(get_buyer)):
-    cart_items = buyer.cart_items
+def get_cart_items(buyer: UserSnapshot = Depends(get_buyer_snapshot), db: Session = Depends(get_read_session)):
+    cart_items = serializers.buyer_cart_items(db, buyer.id)
     if not cart_items:
         raise HTTPException(status_code=404, detail="No cart items found")
-    return [CartItemsInfo.model_validate(item, from_attributes=True) for item in cart_items]
+    return ORJSONResponse(cart_items)
 
 @app.post("/create_order")
 def create_order(order: CreateOrder, buyer=Depends(get_buyer), db: Session = Depends(get_session)):
     buyer.create_order(db, order)
     return {"message": "Order created successfully"}
 
+@app.post("/checkout", response_model=CheckoutResult)
+def checkout(checkout: Optional[Checkout] = None, buyer=Depends(get_buyer), db: Session = Depends(get_session)):
+    return buyer.checkout(db, checkout or Checkout())
+
 @app.get("/my_orders", response_model=list[OrderFullInfo])
-def get_orders(buyer=Depends(get_buyer)):
-    orders = buyer.buyer_orders
+def get_orders(buyer: UserSnapshot = Depends(get_buyer_snapshot), db: Session = Depends(get_read_session)):
+    orders = serializers.buyer_orders(db, buyer.id)
     if not orders:
         raise HTTPException(status_code=404, detail="No orders found")
-    return [OrderFullInfo.model_validate(order, from_attributes=True) for order in orders]
+    return ORJSONResponse(orders)
+
+@app.get("/my_orders/archive", response_model=ArchivedOrderPage)
+def get_archived_orders(query: Annotated[ArchiveQuery, Query()], buyer: UserSnapshot = Depends(get_buyer_snapshot), db: Session = Depends(get_read_session)):
+    return ORJSONResponse(serializers.archived_orders(db, "buyer_id", buyer.id, query))
+
+@app.get("/events")
+async def order_events(last_event_id: Optional[str] = Header(None), buyer: UserSnapshot = Depends(get_buyer_snapshot)):
+    return events_response(buyer.id, last_event_id)
 
 @app.post("/my_orders/{order_id}/confirm")
 def confirm_order(order_id: int, buyer=Depends(get_buyer), db: Session = Depends(get_session)):
@@ -1,23 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
-from utils import get_seller
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from metrics import ORJSONResponse, TimedRoute
+from utils import get_seller, get_seller_snapshot
 from sqlmodel import Session
-from database.db import get_session
+from database.db import get_session, get_read_session
 from schems.posts import *
+from database.models import Order, SellerStat, money
+from export import export_response
+import importer
+import serializers
+from events import events_response
 
-app = APIRouter()
+app = APIRouter(route_class=TimedRoute)
 
 @app.post("/add_product")
 def add_product(product: CreateProduct, seller=Depends(get_seller), db: Session = Depends(get_session)):
     seller.add_product(db, product)
     return {"message": "Product added successfully"}
 
+@app.post("/products/import", response_model=ImportResult)
+async def import_products(request: Request, format: Optional[ExportFormat] = None, seller=Depends(get_seller), db: Session = Depends(get_session)):
+    if format is None:
+        format = ExportFormat.csv if request.headers.get("content-type", "").startswith("text/csv") else ExportFormat.ndjson
+    return await importer.import_products(request.stream(), format, seller, db)
+
+@app.post("/products/{product_id}/flash_sale")
+def start_flash_sale(product_id: int, flash_sale: FlashSale = FlashSale(), seller=Depends(get_seller), db: Session = Depends(get_session)):
+    seller.start_flash_sale(db, product_id, flash_sale)
+    return {"message": "Flash sale started successfully"}
+
+@app.delete("/products/{product_id}/flash_sale")
+def end_flash_sale(product_id: int, seller=Depends(get_seller), db: Session = Depends(get_session)):
+    seller.end_flash_sale(db, product_id)
+    return {"message": "Flash sale ended successfully"}
+
 @app.get("/my_products", response_model=list[ProductFullInfo])
-def get_my_products(seller=Depends(get_seller), db: Session = Depends(get_session)):
-    return [ProductFullInfo.model_validate(product, from_attributes=True) for product in seller.products]
+def get_my_products(seller: UserSnapshot = Depends(get_seller_snapshot), db: Session = Depends(get_read_session)):
+    return ORJSONResponse(serializers.seller_products(db, seller.id))
 
 @app.get("/my_orders", response_model=list[OrderFullInfo])
-def get_my_orders(seller=Depends(get_seller)):
-    return [OrderFullInfo.model_validate(order, from_attributes=True) for order in seller.seller_orders]
+def get_my_orders(seller: UserSnapshot = Depends(get_seller_snapshot), db: Session = Depends(get_read_session)):
+    return ORJSONResponse(serializers.seller_orders(db, seller.id))
+
+@app.get("/my_orders/archive", response_model=ArchivedOrderPage)
+def get_archived_orders(query: Annotated[ArchiveQuery, Query()], seller: UserSnapshot = Depends(get_seller_snapshot), db: Session = Depends(get_read_session)):
+    return ORJSONResponse(serializers.archived_orders(db, "seller_id", seller.id, query))
+
+@app.get("/events")
+async def order_events(last_event_id: Optional[str] = Header(None), seller: UserSnapshot = Depends(get_seller_snapshot)):
+    return events_response(seller.id, last_event_id)
+
+@app.get("/stats", response_model=SellerStatsInfo)
+def get_stats(seller: UserSnapshot = Depends(get_seller_snapshot), db: Session = Depends(get_read_session)):
+    stats = SellerStat.for_seller(db, seller.id)
+    statuses = {
+        status: StatusStats(count=stats[status][0], revenue=money(stats[status][1])) if status in stats
+        else StatusStats(count=0, revenue=0.0)
+        for status in OrderStatus
+    }
+    return SellerStatsInfo(
+        statuses=statuses,
+        total_orders=sum(stat.count for stat in statuses.values()),
+        confirmed_revenue=statuses[OrderStatus.confirmed].revenue
+    )
+
+@app.get("/my_orders/export")
+def export_my_orders(format: ExportFormat = ExportFormat.ndjson, seller: UserSnapshot = Depends(get_seller_snapshot)):
+    return export_response(Order.seller_export_statement(seller.id), format, "orders")
+
+@app.post("/my_orders/bulk/{status}", response_model=BulkTransitionResult)
+def bulk_transition_orders(status: OrderStatus, orders: BulkOrderTransition, seller=Depends(get_seller), db: Session = Depends(get_session)):
+    return seller.bulk_transition_orders(db, orders.order_ids, status)
 
 @app.post("/my_orders/{order_id}/acknowledged")
 def acknowledge_order(order_id: int, seller=Depends(get_seller), db: Session = Depends(get_session)):
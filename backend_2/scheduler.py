@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Callable, List, NamedTuple
+from starlette.concurrency import run_in_threadpool
+from sqlmodel import Session
+from database.db import get_engine
+from database.models import Order, OrderArchive, ProductStockShard, utcnow
+
+logger = logging.getLogger("scheduler")
+
+order_ttl = float(os.getenv("ORDER_TTL", str(24 * 3600)))
+expiry_interval = float(os.getenv("EXPIRY_INTERVAL", "60"))
+expiry_batch_size = int(os.getenv("EXPIRY_BATCH_SIZE", "200"))
+archive_after_days = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+archive_interval = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+archive_batch_size = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+flash_sale_flush_interval = float(os.getenv("FLASH_SALE_FLUSH_INTERVAL", "1"))
+
+
+class Job(NamedTuple):
+    name: str
+    interval: float
+    run: Callable[[], int]
+
+
+def expire_stale_orders(ttl: float = None) -> int:
+    cutoff = utcnow() - timedelta(seconds=order_ttl if ttl is None else ttl)
+    expired, failed = 0, set()
+    with Session(get_engine()) as db:
+        while True:
+            order_ids = Order.expirable_ids(db, cutoff, expiry_batch_size, failed)
+            if not order_ids:
+                return expired
+            try:
+                expired += Order.expire(db, order_ids)
+            except Exception:
+                for order_id in order_ids:
+                    try:
+                        expired += Order.expire(db, [order_id])
+                    except Exception:
+                        logger.exception("Could not expire order %s", order_id)
+                        failed.add(order_id)
+            if len(order_ids) < expiry_batch_size:
+                return expired
+
+def archive_orders(days: float = None, max_batches: int = None) -> int:
+    cutoff = utcnow() - timedelta(days=archive_after_days if days is None else days)
+    archived, batches = 0, 0
+    with Session(get_engine()) as db:
+        while max_batches is None or batches < max_batches:
+            order_ids = OrderArchive.archivable_ids(db, cutoff, archive_batch_size)
+            if not order_ids:
+                break
+            archived += OrderArchive.archive(db, order_ids)
+            batches += 1
+            if len(order_ids) < archive_batch_size:
+                break
+    return archived
+
+def flush_flash_sales() -> int:
+    with Session(get_engine()) as db:
+        return ProductStockShard.flush_all(db)
+
+def default_jobs() -> List[Job]:
+    from idempotency import idempotency_purge_interval, purge_expired_keys
+    return [
+        Job("expire_stale_orders", expiry_interval, expire_stale_orders),
+        Job("purge_idempotency_keys", idempotency_purge_interval, purge_expired_keys),
+        Job("archive_orders", archive_interval, archive_orders),
+        Job("flush_flash_sales", flash_sale_flush_interval, flush_flash_sales),
+    ]
+
+def run_job(job: Job):
+    try:
+        processed = job.run()
+        if processed:
+            logger.info("%s processed %s rows", job.name, processed)
+    except Exception:
+        logger.exception("%s failed", job.name)
+
+async def run_scheduler(stop: asyncio.Event, jobs: List[Job] = None):
+    jobs = jobs or default_jobs()
+    due = {job.name: 0.0 for job in jobs}
+    while not stop.is_set():
+        for job in jobs:
+            if time.monotonic() >= due[job.name]:
+                await run_in_threadpool(run_job, job)
+                due[job.name] = time.monotonic() + job.interval
+        timeout = max(0.0, min(due.values()) - time.monotonic())
+        try:
+            await asyncio.wait_for(stop.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+def run_worker(jobs: List[Job] = None):
+    jobs = jobs or default_jobs()
+    due = {job.name: 0.0 for job in jobs}
+    while True:
+        for job in jobs:
+            if time.monotonic() >= due[job.name]:
+                run_job(job)
+                due[job.name] = time.monotonic() + job.interval
+        time.sleep(max(0.0, min(due.values()) - time.monotonic()))
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, conint
-from typing import Optional, List
+from typing import Optional, List, Dict
+from datetime import datetime
 from enum import Enum
 
 
@@ -15,6 +16,16 @@ class OrderStatus(str, Enum):
     confirmed = "confirmed"
     cancelled = "cancelled"
 
+class ProductSort(str, Enum):
+    id = "id"
+    newest = "newest"
+    price_asc = "price_asc"
+    price_desc = "price_desc"
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
 class CreateCartItem(BaseModel):
     product_id: int = Field(..., ge=1, example=2)
     quantity: int = Field(..., ge=1, example=2)
@@ -26,6 +37,35 @@ class CreateOrder(BaseModel):
     class Config:
         extra = "ignore"
 
+class Checkout(BaseModel):
+    cart_item_ids: Optional[List[int]] = Field(None, max_length=500, example=[1, 2])
+    class Config:
+        extra = "ignore"
+
+class CheckoutItemResult(BaseModel):
+    cart_item_id: int = Field(..., ge=1, example=1)
+    success: bool = Field(..., example=True)
+    detail: Optional[str] = Field(None, example="Insufficient product stock.")
+
+class CheckoutResult(BaseModel):
+    results: List[CheckoutItemResult]
+    total_price: float = Field(..., ge=0, example=39.98)
+
+class FlashSale(BaseModel):
+    shards: int = Field(16, ge=1, le=256, example=16)
+    class Config:
+        extra = "forbid"
+
+class BulkOrderTransition(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=5000, example=[1, 2, 3])
+    class Config:
+        extra = "ignore"
+
+class BulkTransitionResult(BaseModel):
+    status: OrderStatus = Field(..., example=OrderStatus.shipped)
+    updated: List[int] = Field(..., example=[1, 3])
+    rejected: List[int] = Field(..., example=[2])
+
 class CreateUserOpen(BaseModel):
     email: EmailStr = Field(..., example="user@example.com")
     name: str = Field(..., max_length=128, example="John Doe")
@@ -39,12 +79,12 @@ class CreateUser(BaseModel):
     role: Role = Field(..., example=Role.buyer)
 
     @classmethod
-    def from_create_user_open(cls, user_open: CreateUserOpen) -> "CreateUser":
+    def from_create_user_open(cls, user_open: CreateUserOpen, password_hash: Optional[str] = None) -> "CreateUser":
         from utils import hash_password
         return cls(
             email=user_open.email,
             name=user_open.name,
-            password_hash=hash_password(user_open.password),
+            password_hash=password_hash or hash_password(user_open.password),
             role=user_open.role
         )
 
@@ -74,12 +114,48 @@ class ProductInfo(BaseModel):
     class Config:
         extra = "ignore"
 
+class CatalogQuery(BaseModel):
+    cursor: Optional[str] = Field(None, max_length=256)
+    limit: int = Field(20, ge=1, le=100)
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    seller_id: Optional[int] = Field(None, ge=1)
+    in_stock: Optional[bool] = None
+    sort: ProductSort = ProductSort.id
+    class Config:
+        extra = "forbid"
+
+class ProductPage(BaseModel):
+    items: List[ProductInfo]
+    next_cursor: Optional[str] = Field(None, example="WzEyXQ")
+
+class SearchQuery(BaseModel):
+    q: str = Field(..., min_length=1, max_length=128)
+    limit: int = Field(20, ge=1, le=50)
+    offset: int = Field(0, ge=0, le=1000)
+    prefix: bool = False
+    in_stock: Optional[bool] = None
+    class Config:
+        extra = "forbid"
+
+class ProductSearchHit(ProductInfo):
+    score: float = Field(..., example=7.42)
+    name_highlight: str = Field(..., example="Wireless <mark>head</mark>phones")
+    description_snippet: Optional[str] = Field(None, example="Over-ear <mark>head</mark>phones with...")
+
+class ProductSearchPage(BaseModel):
+    items: List[ProductSearchHit]
+
 class WalletInfo(BaseModel):
     balance: float = Field(..., example="100.0")
     frozen: float = Field(..., example="0.0")
     class Config:
         extra = "ignore"
 
+class UserSnapshot(BaseModel):
+    id: int = Field(..., ge=1, example=1)
+    role: Role = Field(..., example=Role.buyer)
+
 class UserInfo(BaseModel):
     email: EmailStr = Field(..., example="user@example.com")
     name: str = Field(..., max_length=128, example="John Doe")
@@ -124,3 +200,43 @@ class ProductFullInfo(BaseModel):
     orders: List[OrderFullInfo]
     class Config:
         extra = "ignore"
+
+class ImportRowError(BaseModel):
+    row: int = Field(..., ge=1, example=3)
+    detail: str = Field(..., example="price: Input should be greater than 0")
+
+class ImportResult(BaseModel):
+    imported: int = Field(..., ge=0, example=49998)
+    failed: int = Field(..., ge=0, example=2)
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+
+class ArchiveQuery(BaseModel):
+    cursor: Optional[str] = Field(None, max_length=256)
+    limit: int = Field(50, ge=1, le=200)
+    class Config:
+        extra = "forbid"
+
+class ArchivedOrderInfo(BaseModel):
+    id: int = Field(..., ge=1, example=1)
+    status: OrderStatus = Field(..., example=OrderStatus.confirmed)
+    product_id: int = Field(..., ge=1, example=2)
+    quantity: int = Field(..., ge=1, example=2)
+    total_price: float = Field(..., gt=0, example=39.98)
+    created_at: datetime = Field(..., example="2026-01-01T12:00:00")
+    archived_at: datetime = Field(..., example="2026-02-01T03:00:00")
+    class Config:
+        extra = "ignore"
+
+class ArchivedOrderPage(BaseModel):
+    items: List[ArchivedOrderInfo]
+    next_cursor: Optional[str] = Field(None, example="WzEyXQ")
+
+class StatusStats(BaseModel):
+    count: int = Field(..., ge=0, example=12)
+    revenue: float = Field(..., ge=0, example=239.88)
+
+class SellerStatsInfo(BaseModel):
+    statuses: Dict[OrderStatus, StatusStats]
+    total_orders: int = Field(..., ge=0, example=40)
+    confirmed_revenue: float = Field(..., ge=0, example=799.6)
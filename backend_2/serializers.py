@@ -0,0 +1,88 @@
+from typing import List
+from sqlmodel import Session, select
+from database.models import CartItem, Order, OrderArchive, Product
+from schems.posts import ArchiveQuery
+
+product_columns = (Product.id, Product.name, Product.description, Product.price, Product.stock)
+
+
+def _product(row, offset: int = 0) -> dict:
+    return {
+        "id": row[offset],
+        "name": row[offset + 1],
+        "description": row[offset + 2],
+        "price": row[offset + 3],
+        "stock": row[offset + 4],
+    }
+
+def _orders(db: Session, statement) -> List[dict]:
+    return [
+        {
+            "id": row[0],
+            "status": row[1],
+            "quantity": row[2],
+            "total_price": row[3],
+            "product": _product(row, 4),
+        }
+        for row in db.exec(statement.order_by(Order.id)).all()
+    ]
+
+def orders_statement():
+    return select(Order.id, Order.status, Order.quantity, Order.total_price, *product_columns).join(Product, Product.id == Order.product_id)
+
+def buyer_orders(db: Session, buyer_id: int) -> List[dict]:
+    return _orders(db, orders_statement().where(Order.buyer_id == buyer_id))
+
+def seller_orders(db: Session, seller_id: int) -> List[dict]:
+    return _orders(db, orders_statement().where(Order.seller_id == seller_id))
+
+def buyer_cart_items(db: Session, buyer_id: int) -> List[dict]:
+    statement = (
+        select(CartItem.id, CartItem.quantity, *product_columns)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.buyer_id == buyer_id)
+        .order_by(CartItem.id)
+    )
+    return [
+        {"id": row[0], "product_id": row[2], "quantity": row[1], "product": _product(row, 2)}
+        for row in db.exec(statement).all()
+    ]
+
+def seller_products(db: Session, seller_id: int) -> List[dict]:
+    products, infos = {}, {}
+    for row in db.exec(select(*product_columns, Product.reserved).where(Product.seller_id == seller_id).order_by(Product.id)).all():
+        infos[row[0]] = _product(row)
+        products[row[0]] = {**infos[row[0]], "reserved": row[5], "orders": []}
+    statement = (
+        select(Order.id, Order.status, Order.quantity, Order.total_price, Order.product_id)
+        .join(Product, Product.id == Order.product_id)
+        .where(Product.seller_id == seller_id)
+        .order_by(Order.id)
+    )
+    for row in db.exec(statement).all():
+        products[row[4]]["orders"].append({
+            "id": row[0],
+            "status": row[1],
+            "quantity": row[2],
+            "total_price": row[3],
+            "product": infos[row[4]],
+        })
+    return list(products.values())
+
+def archived_orders(db: Session, owner_column: str, owner_id: int, query: ArchiveQuery) -> dict:
+    orders, next_cursor = OrderArchive.get_page(db, owner_column, owner_id, query)
+    return {
+        "items": [
+            {
+                "id": order.id,
+                "status": order.status,
+                "product_id": order.product_id,
+                "quantity": order.quantity,
+                "total_price": order.total_price,
+                "created_at": order.created_at,
+                "archived_at": order.archived_at,
+            }
+            for order in orders
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,16 @@
+from typing import Optional
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    db_path: str = "sqlite:///database.db"
+    db_read_path: Optional[str] = None
+    async_db: bool = False
+    db_create_tables: bool = False
+    scheduler_enabled: bool = False
+    metrics_enabled: bool = True
+    admission_enabled: bool = True
+
+    @property
+    def read_path(self) -> str:
+        return self.db_read_path or self.db_path
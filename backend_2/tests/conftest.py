@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("HASH_WORKERS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+from cache import caches
+from main import create_app
+from settings import Settings
+
+
+@pytest.fixture
+def client(tmp_path):
+    for cache in caches.values():
+        cache.clear()
+    settings = Settings(db_path=f"sqlite:///{tmp_path}/test.db", db_create_tables=True, admission_enabled=False, metrics_enabled=False)
+    with TestClient(create_app(settings)) as client:
+        yield client
+
+@pytest.fixture
+def register(client):
+    def register(name: str, role: str) -> dict:
+        user = {"email": f"{name}@example.com", "name": name, "password": "password1", "role": role}
+        assert client.post("/base/registration", json=user).status_code == 200
+        response = client.post("/base/token", json={"email": user["email"], "password": user["password"]})
+        return {"token": response.json()["access_token"]}
+    return register
+
+@pytest.fixture
+def seller(register):
+    return register("seller", "seller")
+
+@pytest.fixture
+def buyer(client, register):
+    headers = register("buyer", "buyer")
+    client.post("/buyer/add_balance/1000", headers=headers)
+    return headers
+
+@pytest.fixture
+def add_product(client, seller):
+    def add_product(price: float = 10.0, stock: int = 10) -> int:
+        response = client.post("/seller/add_product", json={"name": "product", "description": "d", "price": price, "stock": stock}, headers=seller)
+        assert response.status_code == 200
+        return client.get("/seller/my_products", headers=seller).json()[-1]["id"]
+    return add_product
+
+@pytest.fixture
+def order(client, buyer):
+    def order(product_id: int, quantity: int = 1) -> int:
+        assert client.post("/buyer/add_cart_items", json={"product_id": product_id, "quantity": quantity}, headers=buyer).status_code == 200
+        cart_item_id = client.get("/buyer/my_cart_items", headers=buyer).json()[-1]["id"]
+        assert client.post("/buyer/create_order", json={"cart_item_id": cart_item_id}, headers=buyer).status_code == 200
+        return client.get("/buyer/my_orders", headers=buyer).json()[-1]["id"]
+    return order
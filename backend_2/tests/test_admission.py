@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+import admission
+from main import create_app
+from settings import Settings
+
+
+def test_rejections_carry_cors_headers(tmp_path, monkeypatch):
+    monkeypatch.setitem(admission.limiters, "reads", admission.RateLimiter(0.001, 1, 100))
+    settings = Settings(db_path=f"sqlite:///{tmp_path}/test.db", db_create_tables=True, metrics_enabled=False)
+    with TestClient(create_app(settings)) as client:
+        headers = {"Origin": "https://shop.example.com"}
+        assert client.get("/base/products", headers=headers).status_code == 200
+        response = client.get("/base/products", headers=headers)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1000"
+    assert response.headers["access-control-allow-origin"] == "*"
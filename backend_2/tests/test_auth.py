@@ -0,0 +1,28 @@
+import utils
+from sqlmodel import Session, select
+from database.db import get_engine
+from database.models import User
+
+
+def password_hash(name: str) -> str:
+    with Session(get_engine()) as db:
+        return db.exec(select(User.password_hash).where(User.name == name)).one()
+
+def test_login_rehashes_outdated_password(client, register, monkeypatch):
+    register("buyer", "buyer")
+    assert password_hash("buyer").startswith("$2b$04$")
+    monkeypatch.setattr(utils, "bcrypt_rounds", 5)
+    response = client.post("/base/token", json={"email": "buyer@example.com", "password": "password1"})
+    assert response.status_code == 200
+    assert password_hash("buyer").startswith("$2b$05$")
+
+def test_login_rejects_wrong_password(client, register):
+    register("buyer", "buyer")
+    response = client.post("/base/token", json={"email": "buyer@example.com", "password": "password2"})
+    assert response.status_code == 401
+    assert client.post("/base/token", json={"email": "nobody@example.com", "password": "password1"}).status_code == 404
+
+def test_registration_rejects_duplicates(client, register):
+    register("buyer", "buyer")
+    user = {"email": "buyer@example.com", "name": "other", "password": "password1", "role": "buyer"}
+    assert client.post("/base/registration", json=user).status_code == 400
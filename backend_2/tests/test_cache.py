@@ -0,0 +1,18 @@
+from cache import product_cache
+
+
+def catalog_version() -> int:
+    return product_cache.version("catalog:version")
+
+def test_catalog_survives_orders_until_stock_runs_out(client, add_product, order):
+    product_id = add_product(stock=2)
+    assert client.get("/base/products").status_code == 200
+    version = catalog_version()
+
+    order(product_id)
+    assert catalog_version() == version
+    assert client.get(f"/base/product/{product_id}").json()["stock"] == 1
+
+    order(product_id)
+    assert catalog_version() == version + 1
+    assert client.get("/base/products", params={"in_stock": True}).json()["items"] == []
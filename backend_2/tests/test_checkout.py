@@ -0,0 +1,31 @@
+from database.db import count_queries
+
+
+def test_checkout_keeps_going_when_an_item_fails(client, buyer, seller, add_product, order):
+    first, flash, last = add_product(price=10.0), add_product(price=1.0, stock=4), add_product(price=20.0)
+    assert client.post(f"/seller/products/{flash}/flash_sale", json={"shards": 4}, headers=seller).status_code == 200
+    for product_id, quantity in [(first, 1), (flash, 4), (last, 2)]:
+        assert client.post("/buyer/add_cart_items", json={"product_id": product_id, "quantity": quantity}, headers=buyer).status_code == 200
+    cart_items = [item["id"] for item in client.get("/buyer/my_cart_items", headers=buyer).json()]
+    order(flash)
+
+    response = client.post("/buyer/checkout", headers=buyer)
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [
+            {"cart_item_id": cart_items[0], "success": True, "detail": None},
+            {"cart_item_id": cart_items[1], "success": False, "detail": "Insufficient product stock."},
+            {"cart_item_id": cart_items[2], "success": True, "detail": None},
+        ],
+        "total_price": 50.0,
+    }
+    assert [item["id"] for item in client.get("/buyer/my_cart_items", headers=buyer).json()] == [cart_items[1]]
+    assert len(client.get("/buyer/my_orders", headers=buyer).json()) == 3
+
+def test_checkout_freezes_the_wallet_once(client, buyer, add_product):
+    for product_id in [add_product(), add_product(), add_product()]:
+        assert client.post("/buyer/add_cart_items", json={"product_id": product_id, "quantity": 1}, headers=buyer).status_code == 200
+    with count_queries() as counter:
+        assert client.post("/buyer/checkout", headers=buyer).json()["total_price"] == 30.0
+    assert sum(statement.startswith("UPDATE wallet") for statement in counter.statements) == 1
+    assert client.get("/base/me", headers=buyer).json()["wallet"] == {"balance": 970.0, "frozen": 30.0}
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+from database.db import get_engine
+from database.models import CartItem, Order, Product, Role, User, Wallet
+from schems.posts import CreateOrder
+
+BUYERS = 60
+STOCK = 25
+
+
+def seed(engine, balance: float) -> list:
+    with Session(engine) as db:
+        db.exec(insert(User), params=[
+            {"id": i, "email": f"user{i}@example.com", "name": f"user{i}", "password_hash": "x", "role": Role.seller if i == 1 else Role.buyer}
+            for i in range(1, BUYERS + 2)
+        ])
+        db.exec(insert(Wallet), params=[{"user_id": i, "balance": balance, "frozen": 0.0} for i in range(1, BUYERS + 2)])
+        product = Product(seller_id=1, name="hot", description=None, price=1.0, stock=STOCK)
+        db.add(product)
+        db.commit()
+        db.exec(insert(CartItem), params=[{"buyer_id": i, "product_id": product.id, "quantity": 1} for i in range(2, BUYERS + 2)])
+        db.commit()
+        return [tuple(row) for row in db.exec(select(CartItem.buyer_id, CartItem.id)).all()]
+
+def checkout(job) -> str:
+    buyer_id, cart_item_id = job
+    with Session(get_engine()) as db:
+        try:
+            db.get(User, buyer_id).create_order(db, CreateOrder(cart_item_id=cart_item_id))
+            return "ok"
+        except HTTPException as e:
+            return e.detail
+
+def run(balance: float) -> dict:
+    jobs = seed(get_engine(), balance)
+    with ThreadPoolExecutor(16) as pool:
+        outcomes = list(pool.map(checkout, jobs))
+    with Session(get_engine()) as db:
+        product = db.exec(select(Product)).one()
+        return {
+            "ok": outcomes.count("ok"),
+            "stock": product.stock,
+            "reserved": product.reserved,
+            "ordered": db.exec(select(func.coalesce(func.sum(Order.quantity), 0))).one(),
+            "frozen": db.exec(select(func.coalesce(func.sum(Wallet.frozen), 0))).one(),
+            "order_total": db.exec(select(func.coalesce(func.sum(Order.total_price), 0))).one(),
+            "negative_wallets": db.exec(select(func.count()).where((Wallet.balance < 0) | (Wallet.frozen < 0))).one(),
+        }
+
+def test_concurrent_checkout_never_oversells(client):
+    result = run(balance=10.0)
+    assert result["ok"] == STOCK
+    assert result["ordered"] == STOCK
+    assert result["stock"] == 0
+    assert result["reserved"] == result["ordered"]
+    assert result["negative_wallets"] == 0
+    assert abs(result["frozen"] - result["order_total"]) < 1e-6
+
+def test_concurrent_checkout_never_overdraws(client):
+    result = run(balance=0.0)
+    assert result["ok"] == 0
+    assert result["stock"] == STOCK
+    assert result["reserved"] == 0
+    assert result["negative_wallets"] == 0
@@ -0,0 +1,32 @@
+import json
+import cache
+import events
+
+
+def test_foreign_last_event_id_replays_the_buffer(client, buyer, add_product, order):
+    events.hub.buffer.clear()
+    order(add_product())
+    order(add_product())
+    ids = [event["id"] for event in events.hub.buffer]
+    assert len(ids) == 2
+    assert all(event_id.startswith(f"{events.hub.backend.epoch}-") for event_id in ids)
+
+    for last_event_id, expected in [(ids[0], ids[1:]), ("1-2", ids), ("999999999999999999999-1", ids)]:
+        with client.websocket_connect(f"/base/events/ws?token={buyer['token']}&last_event_id={last_event_id}") as ws:
+            assert [json.loads(ws.receive_text())["id"] for _ in expected] == expected
+
+def test_publish_failures_do_not_fail_committed_requests(client, buyer, add_product, monkeypatch):
+    def fail(*args):
+        raise ConnectionError("backend is down")
+    monkeypatch.setattr(events.hub, "publish", fail)
+    monkeypatch.setattr(cache.product_cache, "delete", fail)
+    product_id = add_product()
+    assert client.post("/buyer/add_cart_items", json={"product_id": product_id, "quantity": 1}, headers=buyer).status_code == 200
+    cart_item_id = client.get("/buyer/my_cart_items", headers=buyer).json()[0]["id"]
+
+    headers = {**buyer, "Idempotency-Key": "order-1"}
+    first = client.post("/buyer/create_order", json={"cart_item_id": cart_item_id}, headers=headers)
+    second = client.post("/buyer/create_order", json={"cart_item_id": cart_item_id}, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.headers["idempotent-replayed"] == "true"
+    assert len(client.get("/buyer/my_orders", headers=buyer).json()) == 1
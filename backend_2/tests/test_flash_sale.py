@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlmodel import Session, select
+from database.db import count_queries, get_engine
+from database.models import Product, ProductStockShard, SellerStat
+
+
+def start_flash_sale(client, seller, product_id: int, shards: int):
+    assert client.post(f"/seller/products/{product_id}/flash_sale", json={"shards": shards}, headers=seller).status_code == 200
+
+def test_orders_larger_than_a_shard_span_shards(client, buyer, seller, add_product, order):
+    product_id = add_product(stock=100)
+    start_flash_sale(client, seller, product_id, 16)
+    order(product_id, quantity=10)
+    order(product_id, quantity=90)
+    assert client.post("/buyer/add_cart_items", json={"product_id": product_id, "quantity": 1}, headers=buyer).status_code == 400
+
+    assert client.delete(f"/seller/products/{product_id}/flash_sale", headers=seller).status_code == 200
+    with Session(get_engine()) as db:
+        product = db.get(Product, product_id)
+        assert (product.stock, product.reserved) == (0, 100)
+
+def test_flush_moves_each_reservation_once(client, seller, add_product, order):
+    product_id = add_product(stock=10)
+    start_flash_sale(client, seller, product_id, 4)
+    order(product_id, quantity=3)
+    with Session(get_engine()) as db:
+        assert ProductStockShard.flush(db, product_id) == 3
+        assert ProductStockShard.flush(db, product_id) == 0
+        db.commit()
+        assert db.exec(select(Product.stock, Product.reserved).where(Product.id == product_id)).one() == (7, 3)
+
+def test_concurrent_flushes_do_not_double_count(client, seller, add_product, order):
+    product_id = add_product(stock=50)
+    start_flash_sale(client, seller, product_id, 8)
+    for _ in range(5):
+        order(product_id, quantity=4)
+
+    def flush(_):
+        with Session(get_engine()) as db:
+            flushed = ProductStockShard.flush(db, product_id)
+            db.commit()
+            return flushed
+    with ThreadPoolExecutor(8) as pool:
+        assert sum(pool.map(flush, range(16))) == 20
+    with Session(get_engine()) as db:
+        assert db.exec(select(Product.stock, Product.reserved).where(Product.id == product_id)).one() == (30, 20)
+
+def test_flash_sale_orders_reach_seller_stats_through_flush(client, buyer, seller, add_product, order):
+    product_id = add_product(price=2.0, stock=10)
+    start_flash_sale(client, seller, product_id, 4)
+    assert client.post(f"/buyer/my_orders/{order(product_id, quantity=3)}/cancel", headers=buyer).status_code == 200
+    with count_queries() as counter:
+        order(product_id, quantity=1)
+    assert not any("sellerstat" in statement for statement in counter.statements)
+
+    def created():
+        return client.get("/seller/stats", headers=seller).json()["statuses"]["created"]
+    assert created() == {"count": 1, "revenue": 2.0}
+    with Session(get_engine()) as db:
+        assert db.exec(select(SellerStat.count).where(SellerStat.status == "created")).one() == 0
+        assert SellerStat.verify(db) == []
+        ProductStockShard.flush(db, product_id)
+        db.commit()
+        assert db.exec(select(SellerStat.count).where(SellerStat.status == "created")).one() == 1
+        assert SellerStat.verify(db) == []
+    assert created() == {"count": 1, "revenue": 2.0}
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from fastapi import HTTPException
+from sqlmodel import Session
+from database.db import get_engine
+from database.models import IdempotencyKey, User, utcnow
+from idempotency import responses
+
+
+def add_balance(client, buyer, key: str):
+    return client.post("/buyer/add_balance/5", headers={**buyer, "Idempotency-Key": key, "Origin": "https://shop.example.com"})
+
+def test_replayed_responses_carry_cors_headers(client, buyer):
+    first, second = add_balance(client, buyer, "k1"), add_balance(client, buyer, "k1")
+    assert first.json() == second.json() == {"message": "Balance added successfully", "new_balance": 1005.0}
+    assert second.headers["idempotent-replayed"] == "true"
+    assert second.headers["access-control-allow-origin"] == "*"
+
+def test_retryable_responses_are_not_stored(client, buyer, monkeypatch):
+    original, calls = User.add_balance, []
+    def flaky_add_balance(self, db, amount):
+        calls.append(amount)
+        if len(calls) == 1:
+            raise HTTPException(status_code=409, detail="please retry")
+        return original(self, db, amount)
+    monkeypatch.setattr(User, "add_balance", flaky_add_balance)
+
+    assert add_balance(client, buyer, "k2").status_code == 409
+    response = add_balance(client, buyer, "k2")
+    assert response.status_code == 200
+    assert "idempotent-replayed" not in response.headers
+
+def test_stale_in_progress_claims_can_be_taken_over(client):
+    with Session(get_engine()) as db:
+        assert IdempotencyKey.claim(db, 1, "k3", "a", utcnow() - timedelta(seconds=60)) is None
+        assert IdempotencyKey.claim(db, 1, "k3", "a", utcnow() - timedelta(seconds=60)).status is None
+        assert IdempotencyKey.claim(db, 1, "k3", "b", utcnow() + timedelta(seconds=1)) is None
+        assert db.get(IdempotencyKey, (1, "k3")).fingerprint == "b"
+
+def test_streamed_imports_are_not_buffered(client, seller):
+    rows = b"".join(b'{"name": "product %d", "description": "%s", "price": 1.0, "stock": 1}\n' % (i, b"d" * 200) for i in range(6000))
+    assert len(rows) > 1024 * 1024
+    response = client.post("/seller/products/import", content=rows, headers={**seller, "Idempotency-Key": "k4", "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.json()["imported"] == 6000
+
+def test_cached_responses_are_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(responses, "maxbytes", 1000)
+    for key in range(4):
+        responses.set((1, key), ("f", 200, None, b"x" * 400))
+    assert responses.bytes <= 1000
+    assert responses.get((1, 0)) is None
+    assert responses.get((1, 3)) is not None
@@ -0,0 +1,46 @@
+import re
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from database.db import QueryStats, make_engine, query_stats
+from main import create_app
+from settings import Settings
+
+
+def test_failed_queries_do_not_skew_query_timings():
+    engine = make_engine("sqlite://")
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+    finally:
+        query_stats.reset(token)
+    assert stats.queries == 1
+    assert 0 <= stats.sql_time < 1
+
+def test_metrics_groups_samples_by_family(tmp_path):
+    settings = Settings(db_path=f"sqlite:///{tmp_path}/metrics.db", db_create_tables=True, admission_enabled=False)
+    with TestClient(create_app(settings)) as client:
+        client.post("/base/registration", json={"email": "s@example.com", "name": "s", "password": "password1", "role": "seller"})
+        token = client.post("/base/token", json={"email": "s@example.com", "password": "password1"}).json()["access_token"]
+        response = client.get("/seller/my_products", headers={"token": token})
+        assert re.fullmatch(
+            r'db;dur=[\d.]+;desc="\d+ queries", validate;dur=[\d.]+, serialize;dur=[\d.]+, app;dur=[\d.]+, total;dur=[\d.]+',
+            response.headers["server-timing"]
+        )
+        lines = client.get("/metrics").text.splitlines()
+
+    families, family = [], None
+    for line in lines:
+        if line.startswith("# TYPE "):
+            family = line.split()[2]
+            families.append(family)
+            continue
+        name = re.match(r"[a-z_]+", line).group()
+        assert name == family or name.removeprefix(family) in ("_bucket", "_sum", "_count"), line
+    assert len(families) == len(set(families))
+    assert 'http_request_duration_seconds_count{method="GET",route="/seller/my_products"} 1' in lines
@@ -0,0 +1,35 @@
+import os
+import sqlite3
+from alembic import command
+from alembic.config import Config
+from database.db import configure_engines, get_engine
+from settings import Settings
+
+config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+
+
+def test_baseline_database_upgrades_to_the_models(tmp_path, monkeypatch):
+    path = tmp_path / "baseline.db"
+    monkeypatch.setenv("DB_PATH", f"sqlite:///{path}")
+    command.upgrade(config, "0001")
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO user VALUES (1, 's@example.com', 's', 'x', 'seller'), (2, 'b@example.com', 'b', 'x', 'buyer')")
+        connection.execute("INSERT INTO product VALUES (1, 1, 'Head lamp', 'd', 5.0, 3, 1)")
+        connection.execute("INSERT INTO \"order\" VALUES (1, 2, 1, 1, 1, 5.0, 'confirmed')")
+
+    command.upgrade(config, "head")
+    command.check(config)
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT seller_id, status, count, revenue FROM sellerstat").fetchall() == [(1, "confirmed", 1, 5.0)]
+        assert connection.execute("SELECT rowid FROM product_fts WHERE product_fts MATCH 'lamp'").fetchall() == [(1,)]
+        assert connection.execute("SELECT flash_sale FROM product").fetchall() == [(0,)]
+
+def test_reconfiguring_disposes_the_old_engines(tmp_path):
+    configure_engines(Settings(db_path=f"sqlite:///{tmp_path}/a.db"))
+    engine = get_engine()
+    with engine.connect():
+        pass
+    assert engine.pool.checkedin() == 1
+    configure_engines(Settings(db_path=f"sqlite:///{tmp_path}/b.db"))
+    assert engine.pool.checkedin() == 0
+    assert get_engine() is not engine
@@ -0,0 +1,27 @@
+PRICES = [0.1, 0.2, 0.3, 0.6, 0.7]
+
+
+def confirm(client, buyer, seller, order_id: int):
+    for step in ("acknowledged", "shipped"):
+        assert client.post(f"/seller/my_orders/{order_id}/{step}", headers=seller).status_code == 200
+    for step in ("received", "confirm"):
+        assert client.post(f"/buyer/my_orders/{order_id}/{step}", headers=buyer).status_code == 200
+
+def test_fractional_prices_settle_without_drift(client, buyer, seller, add_product, order):
+    confirmed = [order(add_product(price=price)) for price in PRICES]
+    cancelled = [order(add_product(price=price)) for price in PRICES]
+    for order_id in confirmed:
+        confirm(client, buyer, seller, order_id)
+    for order_id in cancelled:
+        assert client.post(f"/buyer/my_orders/{order_id}/cancel", headers=buyer).status_code == 200
+
+    wallet = client.get("/base/me", headers=buyer).json()["wallet"]
+    assert wallet["frozen"] >= 0
+    assert abs(wallet["balance"] - (1000 - sum(PRICES))) < 1e-6
+
+    response = client.get("/seller/stats", headers=seller)
+    assert response.status_code == 200
+    stats = response.json()
+    assert all(status["revenue"] >= 0 for status in stats["statuses"].values())
+    assert stats["statuses"]["created"]["revenue"] == 0
+    assert abs(stats["confirmed_revenue"] - sum(PRICES)) < 1e-6
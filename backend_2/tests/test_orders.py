@@ -0,0 +1,18 @@
+def test_cancelled_orders_return_stock(client, buyer, add_product, order):
+    product_id = add_product(stock=5)
+    first, _ = order(product_id, quantity=2), order(product_id, quantity=2)
+    assert client.get(f"/base/product/{product_id}").json()["stock"] == 1
+
+    assert client.post(f"/buyer/my_orders/{first}/cancel", headers=buyer).status_code == 200
+    assert client.get(f"/base/product/{product_id}").json()["stock"] == 3
+    assert client.get("/base/me", headers=buyer).json()["wallet"] == {"balance": 980.0, "frozen": 20.0}
+
+def test_cancelled_flash_sale_orders_return_stock(client, buyer, seller, add_product, order):
+    product_id = add_product(stock=4)
+    assert client.post(f"/seller/products/{product_id}/flash_sale", json={"shards": 2}, headers=seller).status_code == 200
+    first, _ = order(product_id, quantity=2), order(product_id, quantity=2)
+
+    assert client.post(f"/buyer/my_orders/{first}/cancel", headers=buyer).status_code == 200
+    assert client.post("/buyer/add_cart_items", json={"product_id": product_id, "quantity": 2}, headers=buyer).status_code == 200
+    assert client.delete(f"/seller/products/{product_id}/flash_sale", headers=seller).status_code == 200
+    assert client.get(f"/base/product/{product_id}").json()["stock"] == 2
@@ -0,0 +1,31 @@
+from database.db import count_queries
+
+LIST_ENDPOINTS = [("/buyer/my_orders", "buyer", 1), ("/buyer/my_cart_items", "buyer", 1), ("/seller/my_orders", "seller", 1), ("/seller/my_products", "seller", 2)]
+
+
+def fill(client, buyer, add_product, order, count: int):
+    for _ in range(count):
+        product_id = add_product()
+        order(product_id)
+        client.post("/buyer/add_cart_items", json={"product_id": product_id, "quantity": 1}, headers=buyer)
+
+def queries(client, path: str, headers: dict) -> int:
+    assert client.get(path, headers=headers).status_code == 200
+    with count_queries() as counter:
+        assert client.get(path, headers=headers).status_code == 200
+    return counter.count
+
+def test_list_endpoints_do_not_grow_with_rows(client, buyer, seller, add_product, order):
+    users = {"buyer": buyer, "seller": seller}
+    fill(client, buyer, add_product, order, 1)
+    before = {path: queries(client, path, users[user]) for path, user, _ in LIST_ENDPOINTS}
+    fill(client, buyer, add_product, order, 5)
+    assert {path: queries(client, path, users[user]) for path, user, _ in LIST_ENDPOINTS} == before
+
+def test_list_endpoint_query_budget(client, buyer, seller, add_product, order):
+    users = {"buyer": buyer, "seller": seller}
+    fill(client, buyer, add_product, order, 3)
+    for path, user, expected in LIST_ENDPOINTS:
+        assert client.get(path, headers=users[user]).status_code == 200
+        with count_queries(expected=expected):
+            client.get(path, headers=users[user])
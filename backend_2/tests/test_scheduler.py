@@ -0,0 +1,42 @@
+from datetime import timedelta
+from sqlalchemy import update
+from sqlmodel import Session
+from database.db import get_engine
+from database.models import Order, utcnow
+from scheduler import archive_orders, expire_stale_orders
+
+
+def test_expired_orders_return_stock(client, buyer, add_product, order):
+    product_id = add_product(stock=2)
+    order(product_id, quantity=2)
+    assert client.get(f"/base/product/{product_id}").json()["stock"] == 0
+
+    assert expire_stale_orders(ttl=-60) == 1
+    assert client.get(f"/base/product/{product_id}").json()["stock"] == 2
+    assert client.get("/buyer/my_orders", headers=buyer).json()[0]["status"] == "cancelled"
+    assert client.get("/base/me", headers=buyer).json()["wallet"] == {"balance": 1000.0, "frozen": 0.0}
+    assert [item["id"] for item in client.get("/base/products", params={"in_stock": True}).json()["items"]] == [product_id]
+
+def test_expired_flash_sale_orders_return_stock(client, seller, add_product, order):
+    product_id = add_product(stock=4)
+    assert client.post(f"/seller/products/{product_id}/flash_sale", json={"shards": 2}, headers=seller).status_code == 200
+    order(product_id, quantity=2)
+    order(product_id, quantity=2)
+
+    assert expire_stale_orders(ttl=-60) == 2
+    assert client.delete(f"/seller/products/{product_id}/flash_sale", headers=seller).status_code == 200
+    assert client.get(f"/base/product/{product_id}").json()["stock"] == 4
+
+def test_archive_uses_the_time_orders_finished(client, buyer, seller, add_product, order):
+    old, recent = order(add_product()), order(add_product())
+    with Session(get_engine()) as db:
+        db.exec(update(Order).values(created_at=utcnow() - timedelta(days=60)))
+        db.commit()
+    for order_id in (old, recent):
+        assert client.post(f"/buyer/my_orders/{order_id}/cancel", headers=buyer).status_code == 200
+    with Session(get_engine()) as db:
+        db.exec(update(Order).where(Order.id == old).values(updated_at=utcnow() - timedelta(days=31)))
+        db.commit()
+
+    assert archive_orders(days=30) == 1
+    assert [item["id"] for item in client.get("/buyer/my_orders", headers=buyer).json()] == [recent]
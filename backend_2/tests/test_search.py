@@ -0,0 +1,33 @@
+import database.models
+
+
+def add_named_product(client, seller, name: str, description: str, stock: int = 5) -> int:
+    product = {"name": name, "description": description, "price": 1.0, "stock": stock}
+    assert client.post("/seller/add_product", json=product, headers=seller).status_code == 200
+    return client.get("/seller/my_products", headers=seller).json()[-1]["id"]
+
+def test_search_ranks_by_relevance_not_recency(client, seller, monkeypatch):
+    monkeypatch.setattr(database.models, "SEARCH_RANKED", 3)
+    best = add_named_product(client, seller, "lamp", "desk lamp")
+    for i in range(5):
+        add_named_product(client, seller, f"shade {i}", "fits a lamp")
+    hits = client.get("/base/products/search", params={"q": "lamp", "limit": 3}).json()["items"]
+    assert hits[0]["id"] == best
+    assert hits[0]["name_highlight"] == "<mark>lamp</mark>"
+    assert hits[0]["score"] > hits[1]["score"]
+
+def test_in_stock_search_reaches_past_sold_out_matches(client, seller, monkeypatch):
+    monkeypatch.setattr(database.models, "SEARCH_RANKED", 3)
+    in_stock = add_named_product(client, seller, "product", "d", stock=5)
+    for _ in range(5):
+        add_named_product(client, seller, "product product", "d", stock=0)
+    response = client.get("/base/products/search", params={"q": "product", "in_stock": True})
+    assert response.status_code == 200
+    assert [hit["id"] for hit in response.json()["items"]] == [in_stock]
+    assert len(client.get("/base/products/search", params={"q": "product", "in_stock": False}).json()["items"]) == 5
+
+def test_new_products_are_searchable_right_away(client, seller):
+    first = add_named_product(client, seller, "teapot", "glass")
+    assert [hit["id"] for hit in client.get("/base/products/search", params={"q": "glass"}).json()["items"]] == [first]
+    second = add_named_product(client, seller, "glass teapot", "glass")
+    assert [hit["id"] for hit in client.get("/base/products/search", params={"q": "glass"}).json()["items"]] == [second, first]
@@ -1,59 +1,213 @@
-import bcrypt
 from datetime import datetime, timedelta, timezone
-import jwt
-from sqlmodel import Session
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sqlmodel import Session, select
 from fastapi import Depends, HTTPException, Header
+from starlette.concurrency import run_in_threadpool
 from database.db import *
+from cache import TTLCache
+from schems.posts import UserSnapshot
 
 
 secret_key = "your_secret_key"
 algorithm = "HS256"
 
+bcrypt_rounds = int(os.getenv("BCRYPT_ROUNDS", "12"))
+hash_workers = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+hash_queue_depth = int(os.getenv("HASH_QUEUE_DEPTH", "8"))
+hash_retry_after = int(os.getenv("HASH_RETRY_AFTER", "1"))
+
+auth_cache_size = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+auth_cache_ttl = float(os.getenv("AUTH_CACHE_TTL", "300"))
+token_cache = TTLCache("auth_tokens", auth_cache_size, auth_cache_ttl)
+user_cache = TTLCache("auth_users", auth_cache_size, auth_cache_ttl)
+
+hash_pool = None
+hash_pool_lock = threading.Lock()
+hash_slots = threading.BoundedSemaphore(hash_queue_depth)
+
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    import bcrypt
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    import bcrypt
+    return bcrypt.checkpw(password, hashed)
+
+def get_hash_pool():
+    global hash_pool
+    if hash_pool is None and hash_workers > 0:
+        with hash_pool_lock:
+            if hash_pool is None:
+                hash_pool = ProcessPoolExecutor(hash_workers)
+    return hash_pool
+
+def shutdown_hash_pool():
+    global hash_pool
+    with hash_pool_lock:
+        if hash_pool is not None:
+            hash_pool.shutdown(cancel_futures=True)
+            hash_pool = None
+
+def acquire_hash_slot():
+    if not hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many password operations in progress, retry later.",
+            headers={"Retry-After": str(hash_retry_after)}
+        )
+
+def run_hashing(fn, *args):
+    acquire_hash_slot()
+    try:
+        pool = get_hash_pool()
+        if pool is None:
+            return fn(*args)
+        return pool.submit(fn, *args).result()
+    finally:
+        hash_slots.release()
+
+async def arun_hashing(fn, *args):
+    acquire_hash_slot()
+    try:
+        pool = get_hash_pool()
+        if pool is None:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(pool.submit(fn, *args))
+    finally:
+        hash_slots.release()
 
 def hash_password(password: str) -> str:
-    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    hashed = run_hashing(_hashpw, password.encode('utf-8'), bcrypt_rounds)
     return hashed.decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return run_hashing(_checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+async def ahash_password(password: str) -> str:
+    hashed = await arun_hashing(_hashpw, password.encode('utf-8'), bcrypt_rounds)
+    return hashed.decode('utf-8')
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await arun_hashing(_checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def needs_rehash(hashed_password: str) -> bool:
+    try:
+        return int(hashed_password.split("$")[2]) != bcrypt_rounds
+    except (IndexError, ValueError):
+        return True
 
 def generate_token(user_id: int) -> str:
+    import jwt
     expiration = datetime.now(timezone.utc) + timedelta(days=1)
     exp_timestamp = int(expiration.timestamp())
     token = jwt.encode({"sub": str(user_id), "exp": exp_timestamp}, secret_key, algorithm=algorithm)
     return token
 
 def decode_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    import jwt
     try:
         payload = jwt.decode(token, secret_key, algorithms=[algorithm])
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-def get_curent_user(db: Session = Depends(get_session), token: str = Header()):
+    token_cache.set(token, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+def token_user_id(token: str) -> int:
     if not token:
         raise HTTPException(status_code=401, detail="Token not provided")
     try:
-        payload = decode_token(token)
-        user_id = int(payload.get("sub"))
-        from database.models import User
-        user = db.get(User, user_id)
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
-        return user
-    except ValueError as e:
+        return int(decode_token(token).get("sub"))
+    except (TypeError, ValueError) as e:
         raise HTTPException(status_code=401, detail=str(e))
 
-def get_buyer(user = Depends(get_curent_user)):
-    from database.models import Role
-    if user.role != Role.buyer:
-        raise HTTPException(status_code=403, detail="Not authorized as a buyer")
+def invalidate_user(user_id: int):
+    user_cache.delete(user_id)
+
+def cache_snapshot(user_id: int, row) -> UserSnapshot:
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    snapshot = UserSnapshot(id=row[0], role=row[1])
+    user_cache.set(user_id, snapshot)
+    return snapshot
+
+def require_role(snapshot: UserSnapshot, role) -> UserSnapshot:
+    if snapshot.role != role:
+        raise HTTPException(status_code=403, detail=f"Not authorized as a {role.value}")
+    return snapshot
+
+def load_user(db: Session, snapshot: UserSnapshot):
+    from database.models import User
+    user = db.get(User, snapshot.id)
+    if user is None:
+        invalidate_user(snapshot.id)
+        raise HTTPException(status_code=404, detail="User not found")
     return user
 
-def get_seller(user = Depends(get_curent_user)):
+async def aload_user(db, snapshot: UserSnapshot):
+    from database.models import User
+    user = await User.aget_by_id(db, snapshot.id)
+    if user is None:
+        invalidate_user(snapshot.id)
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+def get_user_snapshot(db: Session = Depends(get_read_session), token: str = Header()) -> UserSnapshot:
+    user_id = token_user_id(token)
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        from database.models import User
+        snapshot = cache_snapshot(user_id, db.exec(select(User.id, User.role).where(User.id == user_id)).first())
+    return snapshot
+
+async def aget_user_snapshot(db = Depends(get_async_read_session), token: str = Header()) -> UserSnapshot:
+    user_id = token_user_id(token)
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        from database.models import User
+        result = await db.exec(select(User.id, User.role).where(User.id == user_id))
+        snapshot = cache_snapshot(user_id, result.first())
+    return snapshot
+
+async def get_buyer_snapshot(snapshot: UserSnapshot = Depends(get_user_snapshot)) -> UserSnapshot:
+    from database.models import Role
+    return require_role(snapshot, Role.buyer)
+
+async def get_seller_snapshot(snapshot: UserSnapshot = Depends(get_user_snapshot)) -> UserSnapshot:
     from database.models import Role
-    if user.role != Role.seller:
-        raise HTTPException(status_code=403, detail="Not authorized as a seller")
-    return user
\ No newline at end of file
+    return require_role(snapshot, Role.seller)
+
+async def aget_buyer_snapshot(snapshot: UserSnapshot = Depends(aget_user_snapshot)) -> UserSnapshot:
+    from database.models import Role
+    return require_role(snapshot, Role.buyer)
+
+async def aget_seller_snapshot(snapshot: UserSnapshot = Depends(aget_user_snapshot)) -> UserSnapshot:
+    from database.models import Role
+    return require_role(snapshot, Role.seller)
+
+def get_curent_user(snapshot: UserSnapshot = Depends(get_user_snapshot), db: Session = Depends(get_session)):
+    return load_user(db, snapshot)
+
+def get_buyer(snapshot: UserSnapshot = Depends(get_buyer_snapshot), db: Session = Depends(get_session)):
+    return load_user(db, snapshot)
+
+def get_seller(snapshot: UserSnapshot = Depends(get_seller_snapshot), db: Session = Depends(get_session)):
+    return load_user(db, snapshot)
+
+async def aget_curent_user(snapshot: UserSnapshot = Depends(aget_user_snapshot), db = Depends(get_async_session)):
+    return await aload_user(db, snapshot)
+
+async def aget_buyer(snapshot: UserSnapshot = Depends(aget_buyer_snapshot), db = Depends(get_async_session)):
+    return await aload_user(db, snapshot)
+
+async def aget_seller(snapshot: UserSnapshot = Depends(aget_seller_snapshot), db = Depends(get_async_session)):
+    return await aload_user(db, snapshot)